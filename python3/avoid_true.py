@@ -2,8 +2,12 @@
 import sys
 import cgt
 import copy
+import itertools
 
  
+'''Tag for AvoidTrue fingerprints.'''
+AVOID_TRUE_TAG = 4
+
 class AvoidTrue(cgt.ImpartialGame):
     """Models an AvoidTrue state.
     attributes: false variables (a list of indices), true variables (a list of indices), and clauses (a list of lists of indices)."""
@@ -82,6 +86,16 @@ class AvoidTrue(cgt.ImpartialGame):
     def __hash__(self):
         return super().__hash__()
     
+    def fingerprint(self):
+        """Returns a stable 64-bit fingerprint of the standardized formula: its clauses, in order, and its false variables."""
+        standard = self.standardize()
+        ints = [AVOID_TRUE_TAG, len(standard.clauses)]
+        for clause in standard.clauses:
+            ints.append(len(clause))
+            ints += clause
+        ints += standard.false_variables
+        return cgt.fingerprint_sequence(ints)
+    
     def standardize(self):
         """Returns an equivalent version of self to simplify things."""
         standard = copy.deepcopy(self)
@@ -259,210 +273,231 @@ def get_smallest_with_nimber(smasher, nimber):
         return None
 
 
-smasher = cgt.GrundySmasher()
-            
- 
-game_0 = AvoidTrue([[0]], [0], [])
-check_nimber(game_0, 0, smasher)
 
-game_1 = AvoidTrue([[0]], [0, 1], [])
-check_nimber(game_1, 1, smasher)
+def formulas_by_size(max_vars, max_clauses):
+    '''Generates ((#variables, #clauses), position) pairs for the AvoidTrue formulas with no true variables yet, in order of number of variables and then number of clauses.  The clauses are distinct non-empty sets of variables, and variables that aren't in any clause are free.'''
+    for num_vars in range(1, max_vars + 1):
+        all_clauses = []
+        for clause_size in range(1, num_vars + 1):
+            all_clauses += [list(clause) for clause in itertools.combinations(range(num_vars), clause_size)]
+        for num_clauses in range(1, max_clauses + 1):
+            for clauses in itertools.combinations(all_clauses, num_clauses):
+                yield ((num_vars, num_clauses), AvoidTrue(list(clauses), list(range(num_vars)), []))
 
-game_2 = AvoidTrue([[0], [1, 2]], [0, 1, 2], [])
-check_nimber(game_2, 2, smasher)
+def find_smallest_formulas(targets, max_vars = 6, max_clauses = 3, smasher = None):
+    '''Returns a dict from each nimber in targets to the smallest AvoidTrue formula (fewest variables, then fewest clauses) with that nimber, or None if there isn't one within the bounds.  Unlike get_smallest_with_nimber, this doesn't need a sweep first: it stops as soon as every target has been found.'''
+    return cgt.find_smallest_with_nimbers([formulas_by_size(max_vars, max_clauses)], targets, smasher)
 
 
+def two_cnf_clause_lists(vars = [1, 2, 3, 4, 5, 6, 7, 8]):
+    '''Generates the clause lists for the 2-CNF sweep: four 2-variable clauses over the indices in vars, with the first clause fixed as [vars[0], vars[1]] and the next few indices restricted to avoid (most) relabelled repeats.'''
+    for index1 in vars[:1]:
+        for index2 in vars[1:2]:
+            for index3 in vars[:3]:
+                for index4 in vars[:4]:
+                    for index5 in vars[:5]:
+                        for index6 in vars:
+                            for index7 in vars:
+                                for index8 in vars:
+                                    #for index9 in vars:
+                                        #for index10 in vars:
+                                    yield [[index1, index2], [index3, index4], [index5, index6], [index7, index8]] #, [index9, index10]]
 
-print(smasher)
 
-game_3 = AvoidTrue([[0], [1, 2]], [0, 1, 2, 3], [])
-check_nimber(game_3, 3, smasher)
+def three_cnf_clause_lists(vars = [1, 2, 3, 4, 5, 6, 7, 8]):
+    '''Generates the clause lists for the 3-CNF sweep: three 3-variable clauses over the indices in vars, restricted the same way as two_cnf_clause_lists.'''
+    for index1 in vars[:1]:
+        for index2 in vars[1:2]:
+            for index3 in vars[:3]:
+                for index4 in vars[:4]:
+                    for index5 in vars[:5]:
+                        for index6 in vars:
+                            for index7 in vars:
+                                for index8 in vars:
+                                    for index9 in vars:
+                                        #for index10 in vars:
+                                        yield [[index1, index2, index3], [index4, index5, index6], [index7, index8, index9]] #, [index9, index10]]
 
-game_4 = AvoidTrue([[0, 1], [2, 3, 4], [0, 3, 5]], [0, 1, 2, 3, 4, 5], [])
-check_nimber(game_4, 4, smasher)
 
-#game_4 = AvoidTrue([[0], [1,2], [0, 1, 4]], [0, 1, 2, 3, 4], [])
-#game_4 = AvoidTrue([[0], [1,2], [0, 1, 3]], [0, 1, 2, 3, 4], [])
-#check_nimber(game_4, 4, smasher)  #doesn't work!
+def run_experiments():
+    '''Checks the known small nimbers, then (after asking) runs the big 3-CNF sweep and prints any new nimbers found.'''
+    smasher = cgt.GrundySmasher()
 
-game_5 = AvoidTrue([[0, 1], [2, 3, 4], [0, 3, 5]], [0, 1, 2, 3, 4, 5, 6], [])
-check_nimber(game_5, 5, smasher)
+    game_0 = AvoidTrue([[0]], [0], [])
+    check_nimber(game_0, 0, smasher)
 
-game_6 = AvoidTrue([[0, 1, 2], [0, 3, 4], [0, 1, 5, 6], [2, 5, 7, 8]], [0, 1, 2, 3, 4, 5, 6, 7, 8], [])
-check_nimber(game_6, 6, smasher)
+    game_1 = AvoidTrue([[0]], [0, 1], [])
+    check_nimber(game_1, 1, smasher)
 
-game_7 = AvoidTrue([[0, 1, 2], [0, 3, 4], [0, 1, 5, 6], [2, 5, 7, 8]], [0, 1, 2, 3, 4, 5, 6, 7, 8, 9], [])
-check_nimber(game_7, 7, smasher)
+    game_2 = AvoidTrue([[0], [1, 2]], [0, 1, 2], [])
+    check_nimber(game_2, 2, smasher)
 
 
 
-smalls = []
-for nimber in range(8):
-    smallest = get_smallest_with_nimber(smasher, nimber)
-    smalls.append(smallest)
-    print("smallest for *" + str(nimber) + ":")
-    print(smallest)
+    print(smasher)
 
+    game_3 = AvoidTrue([[0], [1, 2]], [0, 1, 2, 3], [])
+    check_nimber(game_3, 3, smasher)
 
+    game_4 = AvoidTrue([[0, 1], [2, 3, 4], [0, 3, 5]], [0, 1, 2, 3, 4, 5], [])
+    check_nimber(game_4, 4, smasher)
 
+    #game_4 = AvoidTrue([[0], [1,2], [0, 1, 4]], [0, 1, 2, 3, 4], [])
+    #game_4 = AvoidTrue([[0], [1,2], [0, 1, 3]], [0, 1, 2, 3, 4], [])
+    #check_nimber(game_4, 4, smasher)  #doesn't work!
 
-    
-print("creating avoid_true_a...")
-avoid_true_a = AvoidTrue([[1, 2, 3], [2, 3, 7], [1]], [], [])
-print("creating avoid_true_b...")
-avoid_true_b = AvoidTrue([[1, 4, 2], [5, 2, 4], [1]], [], [])
+    game_5 = AvoidTrue([[0, 1], [2, 3, 4], [0, 3, 5]], [0, 1, 2, 3, 4, 5, 6], [])
+    check_nimber(game_5, 5, smasher)
 
+    game_6 = AvoidTrue([[0, 1, 2], [0, 3, 4], [0, 1, 5, 6], [2, 5, 7, 8]], [0, 1, 2, 3, 4, 5, 6, 7, 8], [])
+    check_nimber(game_6, 6, smasher)
 
-print("avoid_true_a.standardize():")
-standard_a = avoid_true_a.standardize()
-print(standard_a)
-print()
-print("avoid_true_b.standardize():")
-standard_b = avoid_true_b.standardize()
-print(standard_b)
-print()
-print("Should be True:", standard_a == standard_b)
+    game_7 = AvoidTrue([[0, 1, 2], [0, 3, 4], [0, 1, 5, 6], [2, 5, 7, 8]], [0, 1, 2, 3, 4, 5, 6, 7, 8, 9], [])
+    check_nimber(game_7, 7, smasher)
 
 
 
+    smalls = []
+    for nimber in range(8):
+        smallest = get_smallest_with_nimber(smasher, nimber)
+        smalls.append(smallest)
+        print("smallest for *" + str(nimber) + ":")
+        print(smallest)
 
 
-nimber = smasher.evaluate(avoid_true_a)
-nimberB = smasher.evaluate(avoid_true_b)
 
-print(avoid_true_a)
-print("... has nimber:", nimber)
 
-print(avoid_true_b)
-print("... has nimberB:", nimberB)
+        
+    print("creating avoid_true_a...")
+    avoid_true_a = AvoidTrue([[1, 2, 3], [2, 3, 7], [1]], [], [])
+    print("creating avoid_true_b...")
+    avoid_true_b = AvoidTrue([[1, 4, 2], [5, 2, 4], [1]], [], [])
 
 
+    print("avoid_true_a.standardize():")
+    standard_a = avoid_true_a.standardize()
+    print(standard_a)
+    print()
+    print("avoid_true_b.standardize():")
+    standard_b = avoid_true_b.standardize()
+    print(standard_b)
+    print()
+    print("Should be True:", standard_a == standard_b)
 
 
 
 
 
-game_c = AvoidTrue([[0, 1], [0, 2, 3]], [0, 1, 2, 3, 4], [])
+    nimber = smasher.evaluate(avoid_true_a)
+    nimberB = smasher.evaluate(avoid_true_b)
 
-#print("game_c:")
-#print(game_c)
-#print("... has nimber:",smasher.evaluate(game_c))
+    print(avoid_true_a)
+    print("... has nimber:", nimber)
 
-game_d = AvoidTrue([[0, 3, 5], [1, 1, 2], [1, 3, 4]], [], [5])
+    print(avoid_true_b)
+    print("... has nimberB:", nimberB)
 
-assert smasher.evaluate(game_d) == 3
 
 
-#print("*********************")
-#print()
-#print("game_d:")
-#print(game_d)
-#print(game_d.standardize())
-#print("... has nimber:", smasher.evaluate(game_d))
-#cgt.print_impartial_position_and_options(game_d)
 
 
-#print()
-#print("******************")
-#print()
 
-game_e = AvoidTrue([[0, 3, 5], [1, 1, 2], [1, 3, 4]], [], [])
-assert smasher.evaluate(game_e) == 4
-#print("game_e:")
-#print(game_e)
-#print("... has nimber:", smasher.evaluate(game_e))
 
-#cgt.print_impartial_position_and_options(game_e)
+    game_c = AvoidTrue([[0, 1], [0, 2, 3]], [0, 1, 2, 3, 4], [])
 
-print()
-print("game_f:")
-game_f = AvoidTrue([[0, 1], [2, 3, 4], [0, 3, 5]], [0, 1, 2, 3, 4, 5, 6], [])
-#cgt.print_impartial_position_and_options(game_f)
+    #print("game_c:")
+    #print(game_c)
+    #print("... has nimber:",smasher.evaluate(game_c))
 
-print()
-print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ game_g ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~`")
-game_g = AvoidTrue([[0, 1], [2, 3, 4], [0, 3, 5], [7, 8], [8]], [], [])
-#cgt.print_impartial_position_and_options(game_g)
+    game_d = AvoidTrue([[0, 3, 5], [1, 1, 2], [1, 3, 4]], [], [5])
 
-input("Press Enter to run the big tests...")
+    assert smasher.evaluate(game_d) == 3
 
-#clauses = [[1, 2], [3, 4], [1, 3]]
 
-vars = [1, 2, 3, 4, 5, 6, 7, 8]
+    #print("*********************")
+    #print()
+    #print("game_d:")
+    #print(game_d)
+    #print(game_d.standardize())
+    #print("... has nimber:", smasher.evaluate(game_d))
+    #cgt.print_impartial_position_and_options(game_d)
 
-print("Generating games with variable indices " + str(vars) + "...")
 
-print("Trying out 2-CNF positions...")
+    #print()
+    #print("******************")
+    #print()
 
-if False:
-    for index1 in [1]:
-        for index2 in [2]:
-            for index3 in vars[:3]:
-                for index4 in vars[:4]:
-                    for index5 in vars[:5]:
-                        for index6 in vars:
-                            for index7 in vars:
-                                for index8 in vars:
-                                    #for index9 in vars:
-                                        #for index10 in vars:
-                                    new_clauses = [[index1, index2], [index3, index4], [index5, index6], [index7, index8]] #, [index9, index10]]
-                                    position = AvoidTrue(new_clauses, [], [])
-                                    smasher.evaluate(position)
-                        #print("depth: 5")
-                    print("depth: 4")
-                print("depth: 3")
-            print("depth: 2")
-        print("depth: 1")
-                
-                #print(position)
-                #print("... has nimber: " + str(smasher.evaluate(position)))
- 
+    game_e = AvoidTrue([[0, 3, 5], [1, 1, 2], [1, 3, 4]], [], [])
+    assert smasher.evaluate(game_e) == 4
+    #print("game_e:")
+    #print(game_e)
+    #print("... has nimber:", smasher.evaluate(game_e))
 
+    #cgt.print_impartial_position_and_options(game_e)
 
-print("Done with 2-CNF")
-print()
-print("*********************************************************************************")
-print()
-input("Press enter to try 3-CNF...")
-
-
-for index1 in [1]:
-    for index2 in [2]:
-        for index3 in vars[:3]:
-            for index4 in vars[:4]:
-                for index5 in vars[:5]:
-                    for index6 in vars:
-                        for index7 in vars:
-                            for index8 in vars:
-                                for index9 in vars:
-                                    #for index10 in vars:
-                                    new_clauses = [[index1, index2, index3], [index4, index5, index6], [index7, index8, index9]] #, [index9, index10]]
-                                    position = AvoidTrue(new_clauses, [], [])
-                                    smasher.evaluate(position)
-                    #print("depth: 5")
-                print("depth: 4")
-            print("depth: 3")
-        print("depth: 2")
-    print("depth: 1")
-                
-                #print(position)
-                #print("... has nimber: " + str(smasher.evaluate(position)))
+    print()
+    print("game_f:")
+    game_f = AvoidTrue([[0, 1], [2, 3, 4], [0, 3, 5]], [0, 1, 2, 3, 4, 5, 6], [])
+    #cgt.print_impartial_position_and_options(game_f)
 
-n = 3
-seen_nimbers = list(range(n+1))
-print("Let's look for nimbers above", n, "...")
+    print()
+    print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ game_g ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~`")
+    game_g = AvoidTrue([[0, 1], [2, 3, 4], [0, 3, 5], [7, 8], [8]], [], [])
+    #cgt.print_impartial_position_and_options(game_g)
+
+    input("Press Enter to run the big tests...")
+
+    #clauses = [[1, 2], [3, 4], [1, 3]]
+
+    vars = [1, 2, 3, 4, 5, 6, 7, 8]
+
+    print("Generating games with variable indices " + str(vars) + "...")
+
+    print("Trying out 2-CNF positions...")
+
+    if False:
+        for new_clauses in two_cnf_clause_lists(vars):
+            position = AvoidTrue(new_clauses, [], [])
+            smasher.evaluate(position)
+                    
+                    #print(position)
+                    #print("... has nimber: " + str(smasher.evaluate(position)))
+     
+
+
+    print("Done with 2-CNF")
+    print()
+    print("*********************************************************************************")
+    print()
+    input("Press enter to try 3-CNF...")
+
+
+    for new_clauses in three_cnf_clause_lists(vars):
+        position = AvoidTrue(new_clauses, [], [])
+        smasher.evaluate(position)
+                    
+                    #print(position)
+                    #print("... has nimber: " + str(smasher.evaluate(position)))
+
+    n = 3
+    seen_nimbers = list(range(n+1))
+    print("Let's look for nimbers above", n, "...")
+
+    for position in list(smasher.memo):
+        nimber = smasher.evaluate(position)
+        if not nimber in seen_nimbers:
+            seen_nimbers.append(nimber)
+            print("New nimber!!!!!!")
+            cgt.print_impartial_position_and_options(position)
+            #print(position)
+            #print("... has nimber: " + str(nimber))
+            print()
 
-for position in list(smasher.memo):
-    nimber = smasher.evaluate(position)
-    if not nimber in seen_nimbers:
-        seen_nimbers.append(nimber)
-        print("New nimber!!!!!!")
-        cgt.print_impartial_position_and_options(position)
-        #print(position)
-        #print("... has nimber: " + str(nimber))
-        print()
 
 
 
+    print("Done!")
 
-print("Done!")
+#run the experiments if we're just executing this file directly and not importing it.
+if __name__ == "__main__":
+    run_experiments()
@@ -2,7 +2,14 @@
 author: Kyle Burke <paithanq@gmail.com>
 Right now there are only definitions for Impartial Games.'''
 
+import concurrent.futures
 import copy
+import hashlib
+import heapq
+import random
+import sys
+import threading
+import time
 from abc import ABC, abstractmethod #abstract classes.  Code here modified from alexvassel's answer at: https://stackoverflow.com/questions/13646245/is-it-possible-to-make-abstract-classes-in-python
 
 '''Integer for the left player.'''
@@ -17,7 +24,38 @@ def mex(ints):
     while i in ints:
         i += 1
     return i
-    
+
+
+
+'''Mask for keeping fingerprints to 64 bits.'''
+MASK64 = (1 << 64) - 1
+
+def splitmix64(x):
+    '''Scrambles a 64-bit integer (the SplitMix64 finalizer).  Always gives the same answer, in every process.'''
+    x = (x + 0x9E3779B97F4A7C15) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+zobrist_keys = {} #cache of the keys already generated
+
+def zobrist_key(*parts):
+    '''Returns the fixed random 64-bit Zobrist key for a tuple of non-negative integers, like (game tag, pile index, pile size).'''
+    key = zobrist_keys.get(parts)
+    if key is None:
+        key = 0
+        for part in parts:
+            key = splitmix64(key ^ part)
+        zobrist_keys[parts] = key
+    return key
+
+def fingerprint_sequence(ints):
+    '''Returns a stable 64-bit fingerprint of a sequence of non-negative integers, where the order matters.'''
+    fingerprint = len(ints)
+    for i in ints:
+        fingerprint = splitmix64(fingerprint ^ i)
+    return fingerprint
+
 
 
 class ImpartialGame(ABC):
@@ -32,17 +70,27 @@ class ImpartialGame(ABC):
         '''Returns a standard equivalent version of this game for easier evaluation.'''
         return self
     
+    def fingerprint(self):
+        '''Returns a 64-bit fingerprint of the standard version of this.  Equal positions always get the same fingerprint, in any process or run.  This default version digests the string representation; subclasses can do better.'''
+        digest = hashlib.blake2b(str(self.standardize()).encode(), digest_size = 8).digest()
+        return int.from_bytes(digest, "big")
+    
     def __hash__(self):
-        '''Hashes this just using the string representation.'''
-        return str(self.standardize()).__hash__()
+        '''Hashes this using its fingerprint.'''
+        return self.fingerprint()
+
+'''Tag for the Zobrist keys of Nim piles.'''
+NIM_TAG = 1
 
 class Nim(ImpartialGame):
     '''Models a Nim state.
-    attributes: piles, a list of non-negative integers.'''
+    attributes: piles, a list of non-negative integers.  (The fingerprint is cached along with the piles it was computed for, so it's worked out again if the piles are changed afterwards, even in a deepcopy.)'''
     
     def __init__(self, piles):
-        '''piles is a list of non-negative integers''' 
+        '''piles is a list of non-negative integers'''
         self.piles = copy.deepcopy(piles)
+        self._fingerprint = None
+        self._fingerprinted_piles = None #the piles (as a tuple) that _fingerprint belongs to
     
     def __str__(self):
         '''Returns a string version of this.'''
@@ -51,21 +99,44 @@ class Nim(ImpartialGame):
     def standardize(self):
         new_piles = copy.deepcopy(self.piles)
         new_piles.sort()
-        return Nim(new_piles)
+        standard = Nim(new_piles)
+        if self._fingerprint is not None and tuple(self.piles) == self._fingerprinted_piles:
+            #sorting doesn't change the fingerprint
+            standard.set_fingerprint(self._fingerprint)
+        return standard
+    
+    def set_fingerprint(self, fingerprint):
+        '''Caches fingerprint as the fingerprint of the current piles.'''
+        self._fingerprint = fingerprint
+        self._fingerprinted_piles = tuple(self.piles)
+    
+    def fingerprint(self):
+        '''Returns the sum of the Zobrist keys of the pile sizes.  The sum doesn't depend on the order, so this is already the fingerprint of the standard version, and a move changes it by just one key.'''
+        if self._fingerprint is None or tuple(self.piles) != self._fingerprinted_piles:
+            fingerprint = 0
+            for pile in self.piles:
+                fingerprint += zobrist_key(NIM_TAG, pile)
+            self.set_fingerprint(fingerprint & MASK64)
+        return self._fingerprint
     
     def get_options(self):
         options = []
+        parent_fingerprint = self.fingerprint()
         for i in range(len(self.piles)):
             piles_copy = copy.deepcopy(self.piles)
+            without_pile = parent_fingerprint - zobrist_key(NIM_TAG, self.piles[i])
             for j in range(self.piles[i]):
                 piles_copy[i] = j
                 option = Nim(piles_copy)
+                option.set_fingerprint((without_pile + zobrist_key(NIM_TAG, j)) & MASK64)
                 options.append(option)
         return options
     
     def __eq__(self, other):
-        '''Returns whether two Nim instances are equivalent.'''
-        return self.standardize().piles == other.standardize().piles
+        '''Returns whether two Nim instances are equivalent.  The (cached) fingerprints are compared first, so unequal positions are usually ruled out without sorting anything.'''
+        if not isinstance(other, Nim) or self.fingerprint() != other.fingerprint():
+            return False
+        return self.piles == other.piles or sorted(self.piles) == sorted(other.piles)
     
     #Is this really the best way to do this?  If I don't explicitly say that it has a hash function, then it's not hashable and won't compile.
     def __hash__(self):
@@ -76,21 +147,52 @@ class Nim(ImpartialGame):
     
 
 class GrundySmasher(object):
-    '''Generates the Grundy value (nimber) of an impartial game.'''
+    '''Generates the Grundy value (nimber) of an impartial game.
+    If misere is True, it also finds misère Grundy values in the same pass (terminal positions are *1 instead of *0), and each memo entry is the pair (normal-play value, misère value) instead of just the value.'''
     
-    def __init__(self, verbose = False):
+    def __init__(self, verbose = False, misere = False):
         self.memo = {}
         self.verbose = verbose
+        self.misere = misere
+        self.oracles = [] #(nimberizer, game type, predicate) triples; see add_oracle.
+        self.spot_check_rate = 0.0
+        self.spot_checker = None
+        self.random = random.Random()
+        self.oracle_mismatches = [] #(position, oracle nimber, searched nimber) triples found while spot-checking.
+        self.stats = {"memo_hits": 0, "expansions": 0, "oracle_hits": 0, "spot_checks": 0}
         
     def __str__(self):
         return "I am a GrundySmasher who has evaluated " + str(len(self.memo)) + " positions!"
     
-    def evaluate(self, position):
-        '''Returns the Grundy value of position, an instance of an ImpartialGame.'''
+    def evaluate(self, position, max_nodes = None, deadline = None):
+        '''Returns the Grundy value of position, an instance of an ImpartialGame.
+        If max_nodes (the most new positions to expand) or deadline (a time.time() value) is given, the search stops when it runs out.  Then this returns a SearchHandle instead of the value; call its resume method to carry on.  Everything finished before stopping stays in the memo either way.'''
+        if max_nodes is not None or deadline is not None:
+            handle = SearchHandle(self, position)
+            value = handle.resume(max_nodes, deadline)
+            return handle if value is None else value
+        return self.normal_value(self.evaluate_entry(position))
+    
+    def evaluate_misere(self, position):
+        '''Returns the misère Grundy value of position.  The smasher has to have been made with misere = True.'''
+        if not self.misere:
+            raise ValueError("This GrundySmasher doesn't track misère values; make it with misere = True.")
+        return self.evaluate_entry(position)[1]
+    
+    def evaluate_both(self, position):
+        '''Returns the pair (normal-play Grundy value, misère Grundy value) of position.  The smasher has to have been made with misere = True.'''
+        if not self.misere:
+            raise ValueError("This GrundySmasher doesn't track misère values; make it with misere = True.")
+        return self.evaluate_entry(position)
+    
+    def evaluate_entry(self, position):
+        '''Returns the memo entry for position: its Grundy value, or the pair of values when tracking misère values too.'''
         position = position.standardize() #first reduce to a standard version
         if position in self.memo:
             try:
-                return self.memo[position]
+                value = self.memo[position]
+                self.count("memo_hits")
+                return value
                 #return self.memo.get(position)
             except KeyError:
                 print("Got a KeyError!")
@@ -103,29 +205,290 @@ class GrundySmasher(object):
                 print()
                 print("key in keys:", position in self.memo)
         #else:
+        value = self.oracle_value(position)
+        if value is not None:
+            return value
+        self.count("expansions")
         options = position.get_options()
         option_values = []
         for option in options:
-            option_values.append(self.evaluate(option))
-        value = mex(option_values)
+            option_values.append(self.evaluate_entry(option))
+        value = self.entry_from_options(option_values)
         self.memo[position] = value
         if self.verbose:
-            print("Discovered that " + str(position) + " = *" + str(value))
+            print("Discovered that " + str(position) + " = " + self.entry_string(value))
         return value
-        
+    
+    def entry_from_options(self, option_entries):
+        '''Returns the memo entry for a position whose options have the given memo entries.  Both values come from the same list of options, so misère values cost only one more mex.'''
+        if not self.misere:
+            return mex(option_entries)
+        if len(option_entries) == 0:
+            return (0, 1)
+        return (mex([entry[0] for entry in option_entries]), mex([entry[1] for entry in option_entries]))
+    
+    def normal_value(self, entry):
+        '''Returns the normal-play Grundy value from a memo entry.'''
+        return entry[0] if self.misere else entry
+    
+    def entry_string(self, entry):
+        '''Returns a string version of a memo entry, like "*3" or "*3 (misère *2)".'''
+        if self.misere:
+            return "*" + str(entry[0]) + " (misère *" + str(entry[1]) + ")"
+        return "*" + str(entry)
+    
     def set_verbose(self, verbosity):
         self.verbose = verbosity
         
+    def known_value(self, position):
+        '''Returns the memo entry of position (already standardized) if it's in the memo or an oracle knows it, or None if it would need to be searched.'''
+        if position in self.memo:
+            self.count("memo_hits")
+            return self.memo[position]
+        return self.oracle_value(position)
+        
+    def oracle_value(self, position):
+        '''Returns the memo entry an oracle gives for position (already standardized), storing it in the memo, or None if no oracle applies.'''
+        value = self.ask_oracles(position)
+        if value is not None:
+            self.memo[position] = value
+            if self.verbose:
+                print("An oracle says that " + str(position) + " = " + self.entry_string(value))
+        return value
+        
+    def add_oracle(self, nimberizer, game_type = None, predicate = None):
+        '''Registers nimberizer as a trusted formula: positions that are instances of game_type (if given) and satisfy predicate (if given) get nimberizer.nimberize(position) as their value without searching their options.  Only register formulas that are proven!  When tracking misère values, only nimberizers that also have a misere_nimberize method are used.'''
+        self.oracles.append((nimberizer, game_type, predicate))
+        
+    def set_spot_check(self, rate, seed = None):
+        '''Compares a random fraction (rate, between 0 and 1) of the oracle answers against a full search done without any oracles.  Mismatches are printed and kept in oracle_mismatches.'''
+        self.spot_check_rate = rate
+        if seed is not None:
+            self.random.seed(seed)
+        if rate > 0 and self.spot_checker is None:
+            self.spot_checker = GrundySmasher(misere = self.misere)
+    
+    def ask_oracles(self, position):
+        '''Returns the memo entry the first applicable oracle gives for position (already standardized), or None if no oracle applies.'''
+        for (nimberizer, game_type, predicate) in self.oracles:
+            if game_type is not None and not isinstance(position, game_type):
+                continue
+            if predicate is not None and not predicate(position):
+                continue
+            if self.misere and not hasattr(nimberizer, "misere_nimberize"):
+                continue
+            value = nimberizer.nimberize(position)
+            if self.misere:
+                value = (value, nimberizer.misere_nimberize(position))
+            self.count("oracle_hits")
+            if self.spot_check_rate > 0:
+                value = self.maybe_spot_check(position, value)
+            return value
+        return None
+    
+    def maybe_spot_check(self, position, value):
+        '''With probability spot_check_rate, searches position (already standardized) to check value, the oracle's memo entry for it.  Returns the searched entry if it's different (recording the mismatch), and otherwise value.'''
+        if self.random.random() >= self.spot_check_rate:
+            return value
+        self.count("spot_checks")
+        searched = self.spot_checker.evaluate_entry(position)
+        if searched != value:
+            self.oracle_mismatches.append((position, value, searched))
+            print("Found an inconsistency!!!!  An oracle says", position, "is " + self.entry_string(value), "but it's actually " + self.entry_string(searched))
+            return searched
+        return value
+        
+    def count(self, stat):
+        '''Adds one to the named counter in stats.'''
+        self.stats[stat] += 1
+
+    def fingerprint_memo(self):
+        '''Returns a dict from the fingerprint of each evaluated position to its memo entry, for saving or sharing between processes.'''
+        return dict([(position.fingerprint(), self.memo[position]) for position in self.memo])
+
+    def get_stats(self):
+        '''Returns a dict of counters about this smasher's work so far, including the fraction of new positions that oracles answered.'''
+        stats = dict(self.stats)
+        stats["positions"] = len(self.memo)
+        stats["oracle_mismatches"] = len(self.oracle_mismatches)
+        answered = stats["oracle_hits"] + stats["expansions"]
+        stats["oracle_hit_rate"] = stats["oracle_hits"] / answered if answered > 0 else 0.0
+        return stats
+        
     def has_evaluated(self, position):
         return position.standardize() in self.memo
     
     def print_zeroes(self):
         for position in self.memo:
-            if self.memo[position] == 0:
+            if self.normal_value(self.memo[position]) == 0:
                 print(position)
     
    
     
+class SearchHandle(object):
+    '''A search for the Grundy value of a position that can be stopped and resumed.  It keeps the path of positions still being worked on; everything finished is in the smasher's memo.
+    attributes: position, smasher, done, value (None until done), and nodes (the number of positions this search has expanded).'''
+    
+    def __init__(self, smasher, position):
+        self.smasher = smasher
+        self.position = position.standardize()
+        self.done = False
+        self.value = None
+        self.nodes = 0
+        self.stack = None #each frame: [position, its options, the memo entries of the options finished so far]
+        
+    def __str__(self):
+        if self.done:
+            return "Finished search: " + str(self.position) + " = *" + str(self.value)
+        return "Unfinished search for " + str(self.position) + " (" + str(self.nodes) + " positions expanded, " + str(0 if self.stack is None else len(self.stack)) + " in progress)"
+        
+    def out_of_time(self, expanded, max_nodes, deadline):
+        '''Returns whether the budget for this run has been used up.'''
+        if max_nodes is not None and expanded >= max_nodes:
+            return True
+        return deadline is not None and time.time() >= deadline
+        
+    def expand(self, position):
+        '''Pushes a new frame for position onto the stack.'''
+        self.smasher.count("expansions")
+        self.nodes += 1
+        self.stack.append([position, position.get_options(), []])
+        
+    def resume(self, max_nodes = None, deadline = None):
+        '''Carries on the search, expanding at most max_nodes more positions and stopping at deadline (a time.time() value).  Returns the value if the search finished, or None if it's not yet known.'''
+        if self.done:
+            return self.value
+        smasher = self.smasher
+        expanded = 0
+        if self.stack is None:
+            entry = smasher.known_value(self.position)
+            if entry is not None:
+                self.done = True
+                self.value = smasher.normal_value(entry)
+                return self.value
+            if self.out_of_time(expanded, max_nodes, deadline):
+                return None
+            self.stack = []
+            self.expand(self.position)
+            expanded += 1
+        while self.stack:
+            position, options, entries = self.stack[-1]
+            if len(entries) < len(options):
+                option = options[len(entries)].standardize()
+                entry = smasher.known_value(option)
+                if entry is not None:
+                    entries.append(entry)
+                elif self.out_of_time(expanded, max_nodes, deadline):
+                    return None
+                else:
+                    self.expand(option)
+                    expanded += 1
+            else:
+                entry = smasher.entry_from_options(entries)
+                smasher.memo[position] = entry
+                if smasher.verbose:
+                    print("Discovered that " + str(position) + " = " + smasher.entry_string(entry))
+                self.stack.pop()
+                if self.stack:
+                    self.stack[-1][2].append(entry)
+        self.done = True
+        self.value = smasher.normal_value(entry)
+        return self.value
+        
+
+
+def gil_enabled():
+    '''Returns whether this Python has the global interpreter lock turned on.  (Only free-threaded builds, 3.13 and up, can turn it off.)'''
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return True if is_gil_enabled is None else is_gil_enabled()
+
+
+class ConcurrentGrundySmasher(GrundySmasher):
+    '''A GrundySmasher that many threads can share.  The memo is guarded by striped locks (one lock per group of positions), and a position being evaluated by one thread is marked as in flight, so any other thread that needs it waits for that answer instead of working it out again.  (Options always come before their positions, so waiting can't go around in a circle.)  Thread stacks are as deep as the main one, so very deep positions need sys.setrecursionlimit and threading.stack_size raised, just like with a plain smasher.
+    Throughput only grows with more threads when the GIL is off; see gil_enabled.'''
+
+    def __init__(self, verbose = False, misere = False, *, stripes = 64):
+        '''verbose and misere mean the same as for GrundySmasher, in the same order.  stripes (the number of memo locks) can only be given by name, so nothing passed in GrundySmasher's order can end up there.'''
+        super().__init__(verbose, misere)
+        self.stripes = [threading.Lock() for i in range(stripes)]
+        self.in_flight = {} #position -> threading.Event that gets set when its value is in the memo
+        self.stats_lock = threading.Lock()
+        self.oracle_lock = threading.Lock()
+        self.stats["waits"] = 0
+
+    def __str__(self):
+        return "I am a ConcurrentGrundySmasher who has evaluated " + str(len(self.memo)) + " positions!"
+
+    def count(self, stat):
+        '''Adds one to the named counter in stats, safely.'''
+        with self.stats_lock:
+            self.stats[stat] += 1
+
+    def stripe_for(self, position):
+        '''Returns the lock that guards position (already standardized).'''
+        return self.stripes[hash(position) % len(self.stripes)]
+
+    def maybe_spot_check(self, position, value):
+        '''Spot checks one thread at a time, since they use an ordinary smasher and share oracle_mismatches.  The oracles themselves are asked without any lock.'''
+        with self.oracle_lock:
+            return super().maybe_spot_check(position, value)
+
+    def evaluate(self, position, max_nodes = None, deadline = None):
+        '''Returns the Grundy value of position, an instance of an ImpartialGame.  Budgets and deadlines aren't supported here.'''
+        if max_nodes is not None or deadline is not None:
+            raise ValueError("ConcurrentGrundySmasher doesn't support budgeted searches; use a GrundySmasher for those.")
+        return self.normal_value(self.evaluate_entry(position))
+    
+    def evaluate_entry(self, position):
+        '''Returns the memo entry for position, waiting for any other thread that's already working on it.'''
+        position = position.standardize()
+        stripe = self.stripe_for(position)
+        while True:
+            with stripe:
+                if position in self.memo:
+                    value = self.memo[position]
+                    break
+                event = self.in_flight.get(position)
+                owner = event is None
+                if owner:
+                    event = threading.Event()
+                    self.in_flight[position] = event
+            if owner:
+                try:
+                    value = self.search(position)
+                    with stripe:
+                        self.memo[position] = value
+                finally:
+                    with stripe:
+                        del self.in_flight[position]
+                    event.set()
+                return value
+            #someone else is working on it: wait, then look again (if they failed, we'll take over).
+            self.count("waits")
+            event.wait()
+        self.count("memo_hits")
+        return value
+
+    def search(self, position):
+        '''Returns the memo entry of position (already standardized) from an oracle or by evaluating its options.'''
+        value = self.ask_oracles(position)
+        if value is not None:
+            return value
+        self.count("expansions")
+        option_values = []
+        for option in position.get_options():
+            option_values.append(self.evaluate_entry(option))
+        value = self.entry_from_options(option_values)
+        if self.verbose:
+            print("Discovered that " + str(position) + " = " + self.entry_string(value))
+        return value
+
+    def evaluate_all(self, positions, threads = None):
+        '''Returns the list of values of positions, evaluated by a pool of threads (the default number if threads is None) all sharing this smasher.'''
+        with concurrent.futures.ThreadPoolExecutor(max_workers = threads) as pool:
+            return list(pool.map(self.evaluate, positions))
+
+
 class Nimberizer(ABC):
     '''Abstract superclass for Nimberizers, programs that attempt to find the nimbers of positions using conjectured formulas.'''
     
@@ -138,7 +501,7 @@ class Nimberizer(ABC):
     
     
 class NimNimberizer(object):
-    '''Returns the nimber of a Nim position.  This is known to work correctly (assuming I coded it right) so it can be used with a verifier.'''
+    '''Returns the nimber of a Nim position.  This is known to work correctly (assuming I coded it right) so it can be used with a verifier or as an oracle (smasher.add_oracle(NimNimberizer(), Nim)).'''
     
     def nimberize(self, nim):
         '''Returns the xor of the values of the piles.'''
@@ -147,6 +510,14 @@ class NimNimberizer(object):
             nim_sum ^= pile # ^ is XOR
         return nim_sum
     
+    def misere_nimberize(self, nim):
+        '''Returns the misère Grundy value: the same xor, except flipped by 1 when no pile has more than one stick.'''
+        nim_sum = self.nimberize(nim)
+        for pile in nim.piles:
+            if pile > 1:
+                return nim_sum
+        return nim_sum ^ 1
+
        
     
     
@@ -158,6 +529,7 @@ class NimberizerVerifier(object):
         self.smasher = smasher
         self.correctness_memo = {} #keeps track of whether the values are correct or incorrect.  Necessary???
         self.incorrect = []
+        self.lock = threading.Lock() #guards correctness_memo and incorrect, so a ConcurrentGrundySmasher can be used from many threads
         
     def evaluate(self, position):
         '''Evaluates a single position, first checking whether it already knows the result.'''
@@ -166,10 +538,13 @@ class NimberizerVerifier(object):
         else:
             guess_nimber = self.nimberizer.nimberize(position)
             nimber = self.smasher.evaluate(position)
-            self.correctness_memo[position] = nimber == guess_nimber
-            if nimber != guess_nimber:
-                self.incorrect.append(position)
-                print("Found an inconsistency!!!!")
+            with self.lock:
+                if position in self.correctness_memo:
+                    return nimber #another thread already recorded it
+                self.correctness_memo[position] = nimber == guess_nimber
+                if nimber != guess_nimber:
+                    self.incorrect.append(position)
+                    print("Found an inconsistency!!!!")
             return nimber
         
     def verify(self, position):
@@ -183,6 +558,21 @@ class NimberizerVerifier(object):
             actual_nimber = self.evaluate(position)
             return guess_nimber == actual_nimber
             
+    def verify_many(self, positions):
+        '''Verifies a list of positions, returning a list of whether we got each one right.  The smasher evaluates them all with one evaluate_many call, so it has to have that method (like nim_batch.ArrayNimSmasher).'''
+        nimbers = self.smasher.evaluate_many(positions)
+        correctnesses = []
+        with self.lock:
+            for position, nimber in zip(positions, nimbers):
+                if position not in self.correctness_memo:
+                    guess_nimber = self.nimberizer.nimberize(position)
+                    self.correctness_memo[position] = nimber == guess_nimber
+                    if nimber != guess_nimber:
+                        self.incorrect.append(position)
+                        print("Found an inconsistency!!!!")
+                correctnesses.append(self.correctness_memo[position])
+        return correctnesses
+            
     def has_verified(self, position):
         '''Returns whether we have already verified a position.'''
         if position in self.incorrect:
@@ -198,11 +588,17 @@ class NimberizerVerifier(object):
             print(str(position) + "\n     Guess: *" + str(self.nimberizer.nimberize(position)) + "\n    Actual: *" + str(self.smasher.evaluate(position)) + "\n\n")
         print("Done with incorrectly-evaluated games!")
         
-    def verify_all(self, positions):
-        '''Returns whether a set of positions evaluate correctly.'''
+    def verify_all(self, positions, threads = None):
+        '''Returns whether a set of positions evaluate correctly.  If threads is given, that many threads do the verifying; the smasher should be a ConcurrentGrundySmasher then.  Otherwise, a smasher with an evaluate_many method gets all the positions in one batch.'''
+        if threads is None and hasattr(self.smasher, "evaluate_many"):
+            correctnesses = self.verify_many(positions)
+        elif threads is None:
+            correctnesses = [self.verify(position) for position in positions]
+        else:
+            with concurrent.futures.ThreadPoolExecutor(max_workers = threads) as pool:
+                correctnesses = list(pool.map(self.verify, positions))
         all_correct = True
-        for position in positions:
-            correctness = self.verify(position)
+        for correctness in correctnesses:
             all_correct = all_correct and correctness
         
         #print out all the incorrect values before returning.  I probably shouldn't always do this, but I do right now.
@@ -229,7 +625,43 @@ def print_impartial_position_and_options(position, smasher = GrundySmasher()):
         nimbers.append(nimber)
     print()
     print("All nimbers:", nimbers)
- 
+
+
+def find_smallest_with_nimbers(families, targets, smasher = None):
+    '''Returns a dict from each nimber in targets to the smallest position found with that nimber (or None if there wasn't one).
+    families is a list of generators of (size, position) pairs, each in order of non-decreasing size.  They are merged together and evaluated in size order with one shared smasher, skipping positions that standardize to ones already seen.  The search stops as soon as every target has been found.'''
+    if smasher is None:
+        smasher = GrundySmasher()
+    smallest = dict([(target, None) for target in targets])
+    missing = set(targets)
+    seen = set() #standardized positions; the set hashes them by fingerprint but also checks equality, so a fingerprint collision can't drop a candidate.
+    for size, position in heapq.merge(*families, key = lambda pair: pair[0]):
+        if len(missing) == 0:
+            break
+        standard = position.standardize()
+        if standard in seen:
+            continue
+        seen.add(standard)
+        nimber = smasher.evaluate(standard)
+        if nimber in missing:
+            smallest[nimber] = position
+            missing.discard(nimber)
+    return smallest
+
+def nims_by_total(num_piles, max_total):
+    '''Generates (total, position) pairs for the standard Nim positions with num_piles piles, in order of the total number of sticks.'''
+    def partitions(total, parts, smallest):
+        if parts == 0:
+            if total == 0:
+                yield []
+            return
+        for first in range(smallest, total // parts + 1):
+            for rest in partitions(total - first, parts - 1, first):
+                yield [first] + rest
+    for total in range(max_total + 1):
+        for piles in partitions(total, num_piles, 0):
+            yield (total, Nim(piles))
+
  
  
  
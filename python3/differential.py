@@ -0,0 +1,442 @@
+'''Differential testing: checks faster evaluation engines against the plain reference GrundySmasher.
+
+For each game, a batch of bounded positions (all of them, or a random sample) is evaluated by the reference engine and by each candidate engine.  Any disagreement is shrunk down to a small position that still disagrees, and each engine's speedup over the reference is reported next to its correctness results.  Engines that give misère values are checked against a plain misère search instead.  QuantumNim positions are also checked against the original QuantumNim code (kept here as LegacyQuantumNim), since the reference smasher uses the rewritten class too.  Run it with:
+    python3 differential.py --random 200 --seed 1'''
+
+import argparse
+import copy
+import itertools
+import random
+import sys
+import time
+
+import cgt
+import quantumNim
+import avoid_true
+import nim_batch
+import graph_solver
+
+
+def reference_engine():
+    '''Returns the reference evaluation function: a fresh, plain GrundySmasher.'''
+    return cgt.GrundySmasher().evaluate
+
+def misere_reference_engine():
+    '''Returns the reference evaluation function for misère values: a plain search where terminal positions are *1 and every other position is the mex of its options' values.'''
+    memo = {}
+    def evaluate(position):
+        position = position.standardize()
+        if position not in memo:
+            options = position.get_options()
+            memo[position] = 1 if len(options) == 0 else cgt.mex([evaluate(option) for option in options])
+        return memo[position]
+    return evaluate
+
+def smasher_evaluator(smasher, misere = False):
+    '''Returns smasher's misère evaluation function if misere is True, and its normal one otherwise.'''
+    return smasher.evaluate_misere if misere else smasher.evaluate
+
+def oracle_engine(misere = False):
+    '''Returns the evaluation function of a smasher that uses the proven Nim and QuantumNim oracles.'''
+    smasher = cgt.GrundySmasher(misere = misere)
+    quantumNim.add_oracles(smasher)
+    return smasher_evaluator(smasher, misere)
+
+def budgeted_engine(max_nodes = 7, misere = False):
+    '''Returns an evaluation function that searches in small budgeted steps, resuming each time, to check that stopping and resuming doesn't change any answers.'''
+    smasher = cgt.GrundySmasher(misere = misere)
+    def evaluate(position):
+        result = smasher.evaluate(position, max_nodes = max_nodes)
+        while isinstance(result, cgt.SearchHandle):
+            if result.resume(max_nodes) is not None:
+                result = result.value
+        if misere:
+            #the search is finished, so this just looks the misère value up in the memo.
+            return smasher.evaluate_misere(position)
+        return result
+    return evaluate
+
+def concurrent_engine(threads = 4, misere = False):
+    '''Returns an evaluation function that shares one ConcurrentGrundySmasher between several threads, each starting from a different option of the position.'''
+    smasher = cgt.ConcurrentGrundySmasher(misere = misere)
+    def evaluate(position):
+        smasher.evaluate_all(position.get_options(), threads)
+        return smasher_evaluator(smasher, misere)(position)
+    return evaluate
+
+def both_engine():
+    '''Returns an evaluation function that gives the misère half of a misère smasher's evaluate_both.'''
+    smasher = cgt.GrundySmasher(misere = True)
+    return lambda position: smasher.evaluate_both(position)[1]
+
+'''Maps each candidate engine's name to a function that builds a fresh evaluation function (position -> nimber) for it.'''
+ENGINES = {
+    "oracles": oracle_engine,
+    "nim_table": lambda: nim_batch.ArrayNimSmasher(max_pile = 15).evaluate,
+    "graph": lambda: graph_solver.solve,
+    "graph_fingerprints": lambda: (lambda position: graph_solver.solve(position, fingerprints = True)),
+    "budgeted": budgeted_engine,
+    "concurrent": concurrent_engine,
+    "misere_normal": lambda: cgt.GrundySmasher(misere = True).evaluate,
+    "misere": lambda: cgt.GrundySmasher(misere = True).evaluate_misere,
+    "misere_both": both_engine,
+    "misere_oracles": lambda: oracle_engine(misere = True),
+    "misere_budgeted": lambda: budgeted_engine(misere = True),
+    "misere_concurrent": lambda: concurrent_engine(misere = True),
+}
+
+'''Maps the names of engines that only handle some games to the list of those games.  Engines not listed here are run on every game.'''
+ENGINE_GAMES = {
+    "nim_table": ["nim"],
+}
+
+'''Names of the engines that give misère values, which are checked against misere_reference_engine instead of reference_engine.'''
+MISERE_ENGINES = set(["misere", "misere_both", "misere_oracles", "misere_budgeted", "misere_concurrent"])
+
+def register_engine(name, factory, games = None, misere = False):
+    '''Adds a candidate engine.  factory takes no arguments and returns a fresh evaluation function.  If the engine only handles some games, games is the list of their names.  If it gives misère values, misere should be True.'''
+    ENGINES[name] = factory
+    if games is not None:
+        ENGINE_GAMES[name] = games
+    if misere:
+        MISERE_ENGINES.add(name)
+
+def reference_for(name):
+    '''Returns the reference engine factory that the named engine is checked against.'''
+    return misere_reference_engine if name in MISERE_ENGINES else reference_engine
+
+
+#### Bounded position generators ####
+
+def nim_positions(max_piles = 3, max_size = 5):
+    '''Generates every Nim position with at most max_piles piles of at most max_size sticks.'''
+    for num_piles in range(1, max_piles + 1):
+        for piles in itertools.product(range(max_size + 1), repeat = num_piles):
+            yield cgt.Nim(list(piles))
+
+def random_nim(rng, max_piles = 4, max_size = 7):
+    '''Returns a random Nim position.'''
+    return cgt.Nim([rng.randint(0, max_size) for i in range(rng.randint(1, max_piles))])
+
+def quantum_nim_positions(max_nims = 2, max_size = 3):
+    '''Generates every two-pile QuantumNim superposition of at most max_nims nims with piles of at most max_size sticks.'''
+    pile_tuples = list(itertools.product(range(max_size + 1), repeat = 2))
+    for num_nims in range(1, max_nims + 1):
+        for combination in itertools.combinations(pile_tuples, num_nims):
+            yield quantumNim.QuantumNim([cgt.Nim(list(piles)) for piles in combination])
+
+def random_quantum_nim(rng, max_nims = 3, max_size = 4):
+    '''Returns a random two-pile QuantumNim position.'''
+    return quantumNim.QuantumNim([cgt.Nim([rng.randint(0, max_size), rng.randint(0, max_size)]) for i in range(rng.randint(1, max_nims))])
+
+def avoid_true_positions(num_vars = 3, max_clauses = 2):
+    '''Generates every AvoidTrue formula with at most max_clauses distinct clauses over num_vars variables, plus the same formulas with one extra free variable.'''
+    clauses = []
+    for size in range(1, num_vars + 1):
+        clauses += [list(clause) for clause in itertools.combinations(range(num_vars), size)]
+    for num_clauses in range(1, max_clauses + 1):
+        for combination in itertools.combinations(clauses, num_clauses):
+            yield avoid_true.AvoidTrue(list(combination), [], [])
+            yield avoid_true.AvoidTrue(list(combination), [num_vars], [])
+
+def random_avoid_true(rng, max_vars = 5, max_clauses = 3, max_clause_size = 3):
+    '''Returns a random AvoidTrue formula, possibly with some variables already true.'''
+    num_vars = rng.randint(1, max_vars)
+    clauses = [rng.sample(range(num_vars), rng.randint(1, min(num_vars, max_clause_size))) for i in range(rng.randint(1, max_clauses))]
+    trues = [var for var in range(num_vars) if rng.random() < 0.2]
+    position = avoid_true.AvoidTrue(clauses, [var for var in range(num_vars) if var not in trues], trues)
+    if not position.check_still_false():
+        return avoid_true.AvoidTrue(clauses, list(range(num_vars)), [])
+    return position
+
+
+#### Shrinking ####
+
+def smaller_nims(nim):
+    '''Generates Nim positions a little smaller than nim.'''
+    for i in range(len(nim.piles)):
+        if len(nim.piles) > 1:
+            yield cgt.Nim(nim.piles[:i] + nim.piles[i+1:])
+        if nim.piles[i] > 0:
+            piles = list(nim.piles)
+            piles[i] -= 1
+            yield cgt.Nim(piles)
+
+def smaller_quantum_nims(qNim):
+    '''Generates QuantumNim positions a little smaller than qNim.'''
+    nims = qNim.nims
+    for i in range(len(nims)):
+        if len(nims) > 1:
+            yield quantumNim.QuantumNim(nims[:i] + nims[i+1:], qNim.width)
+        for smaller in smaller_nims(nims[i]):
+            if len(smaller.piles) == len(nims[i].piles):
+                yield quantumNim.QuantumNim(nims[:i] + [smaller] + nims[i+1:], qNim.width)
+
+def smaller_avoid_trues(position):
+    '''Generates AvoidTrue positions a little smaller than position.'''
+    clauses = position.clauses
+    used = set([var for clause in clauses for var in clause])
+    for var in position.false_variables:
+        if var not in used:
+            yield avoid_true.AvoidTrue(clauses, [other for other in position.false_variables if other != var], position.true_variables)
+    for i in range(len(clauses)):
+        if len(clauses) > 1:
+            yield avoid_true.AvoidTrue(clauses[:i] + clauses[i+1:], position.false_variables, position.true_variables)
+        if len(clauses[i]) > 1:
+            for j in range(len(clauses[i])):
+                shorter = clauses[i][:j] + clauses[i][j+1:]
+                yield avoid_true.AvoidTrue(clauses[:i] + [shorter] + clauses[i+1:], position.false_variables, position.true_variables)
+
+'''Game name -> (exhaustive generator, random generator, shrinker).'''
+GAMES = {
+    "nim": (nim_positions, random_nim, smaller_nims),
+    "quantum_nim": (quantum_nim_positions, random_quantum_nim, smaller_quantum_nims),
+    "avoid_true": (avoid_true_positions, random_avoid_true, smaller_avoid_trues),
+}
+
+
+def evaluate_safely(evaluate, position):
+    '''Returns evaluate(position), or a string describing the error if it raises one.'''
+    try:
+        return evaluate(position)
+    except Exception as error:
+        return "error: " + repr(error)
+
+def disagrees(engine_factory, position, reference = reference_engine):
+    '''Returns whether fresh reference and candidate engines disagree about position.'''
+    return evaluate_safely(reference(), position) != evaluate_safely(engine_factory(), position)
+
+def shrink(game, engine_factory, position, reference = reference_engine):
+    '''Returns a small position that the engine still gets wrong, found by repeatedly moving to a smaller variant or an option of position that also disagrees.'''
+    shrinker = GAMES[game][2]
+    improved = True
+    while improved:
+        improved = False
+        candidates = itertools.chain(shrinker(position), position.get_options())
+        for candidate in candidates:
+            if disagrees(engine_factory, candidate, reference):
+                position = candidate
+                improved = True
+                break
+    return position
+
+
+#### The original QuantumNim ####
+
+class LegacyQuantumNim(cgt.ImpartialGame):
+    '''The original two-pile QuantumNim, with its Nim-object domination filter and option generation, kept as a reference for the faster pile-tuple version in quantumNim.py.
+    That filter compared nims with Nim.__eq__, which ignores pile order, so it could drop a nim like (3, 0) when (0, 3) was also around.  dropped says whether that happened while building this position.'''
+    
+    def __init__(self, nims):
+        '''Constructor.  nims is a list of two-pile Nim objects.'''
+        optionNims = copy.deepcopy(nims)
+        slimmedOptions = [] #a shorter list of non-dominated positions
+        for i in range(len(optionNims)):
+            maybeDominated = optionNims[i]
+            dominated = False
+            for j in range(len(optionNims)):
+                other = optionNims[j]
+                if (i != j) and legacy_nim_dominates(maybeDominated, other):
+                    #check to see whether they're equal and whether one already exists
+                    if (maybeDominated == other) and (not maybeDominated in slimmedOptions):
+                        pass #we do want to maybe add it
+                    else:
+                        dominated = True
+            if not dominated:
+                slimmedOptions.append(maybeDominated)
+        self.nims = slimmedOptions
+        self.dropped = sorted([tuple(nim.piles) for nim in slimmedOptions]) != sorted(quantumNim.minimalPiles([tuple(nim.piles) for nim in nims]))
+        
+    def __str__(self):
+        nimStrings = ["(" + ", ".join([str(pile) for pile in nim.piles]) + ")" for nim in self.nims]
+        if len(nimStrings) == 1:
+            return nimStrings[0]
+        return "<" + " | ".join(nimStrings) + ">"
+        
+    def get_options(self):
+        '''Returns all options from this position: every classical move, then every width-2 quantum move, in the same order as QuantumNim.get_options.'''
+        maxes = copy.deepcopy(self.nims[0].piles)
+        for nim in self.nims:
+            for i in range(len(nim.piles)):
+                maxes[i] = max(maxes[i], nim.piles[i])
+        options = []
+        for i in range(len(maxes)):
+            for sticks in range(1, maxes[i]+1):
+                options.append(self.getOptionFromClassicalMove(i, sticks))
+        for iA in range(len(maxes)-1):
+            for sticksA in range(1, maxes[iA]+1):
+                for iB in range(iA + 1, len(maxes)):
+                    for sticksB in range(1, maxes[iB]+1):
+                        options.append(self.getOptionFromQuantumMove(iA, sticksA, iB, sticksB))
+        return options
+    
+    def __eq__(self, other):
+        return str(self.standardize()) == str(other.standardize())
+    
+    def __hash__(self):
+        return super().__hash__()
+    
+    def standardize(self):
+        '''Returns a new version of this with the nims ordered (and maybe all flipped).'''
+        copyNims = copy.deepcopy(self.nims)
+        copyNims.sort(key = str)
+        clone = LegacyQuantumNim(copyNims)
+        flippedNims = [cgt.Nim([nim.piles[1], nim.piles[0]]) for nim in self.nims]
+        flippedNims.sort(key = str)
+        flipped = LegacyQuantumNim(flippedNims)
+        if str(clone) < str(flipped):
+            return clone
+        return flipped
+        
+    def getOptionFromClassicalMove(self, pileI, sticksTaken):
+        optionNims = []
+        for nim in self.nims:
+            if nim.piles[pileI] >= sticksTaken:
+                optionNim = copy.deepcopy(nim)
+                optionNim.piles[pileI] -= sticksTaken
+                optionNims.append(optionNim)
+        return LegacyQuantumNim(optionNims)
+    
+    def getOptionFromQuantumMove(self, pileIA, sticksA, pileIB, sticksB):
+        qNimA = self.getOptionFromClassicalMove(pileIA, sticksA)
+        qNimB = self.getOptionFromClassicalMove(pileIB, sticksB)
+        return LegacyQuantumNim(copy.deepcopy(qNimA.nims) + copy.deepcopy(qNimB.nims))
+
+def legacy_nim_dominates(a, b):
+    '''Returns true if each pile of the Nim a is at least as big as the same pile of the Nim b.'''
+    for i in range(len(a.piles)):
+        if a.piles[i] < b.piles[i]:
+            return False
+    return True
+
+def superposition_key(pileTuples):
+    '''Returns the same key for any two-pile superposition with the same nims, whatever their order and whether or not the piles are flipped.'''
+    return min(sorted(pileTuples), sorted([(piles[1], piles[0]) for piles in pileTuples]))
+
+def legacy_value(position, memo):
+    '''Returns the pair (Grundy value, clean) of a LegacyQuantumNim, where clean is False if the old filter dropped a nim anywhere below it, so the value can't be trusted.  memo maps standardized strings to pairs.'''
+    position = position.standardize()
+    key = str(position)
+    if key not in memo:
+        values = []
+        clean = not position.dropped
+        for option in position.get_options():
+            value, option_clean = legacy_value(option, memo)
+            values.append(value)
+            clean = clean and option_clean and not option.dropped
+        memo[key] = (cgt.mex(values), clean)
+    return memo[key]
+
+def check_quantum_nim_against_legacy(positions):
+    '''Checks two-pile, width-2 QuantumNim positions against LegacyQuantumNim: the options must match one for one, and so must the values.  Options and values that the old filter got wrong are skipped.  Returns a report dict: the number of positions, how many options and values were skipped, the number of disagreements, and the failures.'''
+    smasher = cgt.GrundySmasher()
+    memo = {}
+    report = {"positions": 0, "skipped_options": 0, "skipped_values": 0, "disagreements": 0, "failures": []}
+    for position in positions:
+        if position.width != 2 or len(position.pileTuples[0]) != 2:
+            continue
+        report["positions"] += 1
+        legacy = LegacyQuantumNim([cgt.Nim(list(piles)) for piles in position.pileTuples])
+        legacy_options = legacy.get_options()
+        options = position.get_options()
+        problems = []
+        if len(legacy_options) != len(options):
+            problems.append(str(len(legacy_options)) + " options in the original but " + str(len(options)) + " now")
+        for legacy_option, option in zip(legacy_options, options):
+            if legacy_option.dropped:
+                report["skipped_options"] += 1
+            elif superposition_key([tuple(nim.piles) for nim in legacy_option.nims]) != superposition_key(option.pileTuples):
+                problems.append("option " + str(legacy_option) + " in the original but " + str(option) + " now")
+        value, clean = legacy_value(legacy, memo)
+        if not clean:
+            report["skipped_values"] += 1
+        elif value != smasher.evaluate(position):
+            problems.append("value *" + str(value) + " in the original but *" + str(smasher.evaluate(position)) + " now")
+        if problems:
+            report["disagreements"] += 1
+            report["failures"].append((position, problems))
+    return report
+
+def print_legacy_report(report):
+    '''Prints out the report from check_quantum_nim_against_legacy.'''
+    status = "OK" if report["disagreements"] == 0 else str(report["disagreements"]) + " DISAGREEMENTS"
+    print("quantum_nim / original QuantumNim: " + status + " on " + str(report["positions"]) + " positions (skipped " + str(report["skipped_options"]) + " options and " + str(report["skipped_values"]) + " values where the original filter dropped a nim)")
+    for (position, problems) in report["failures"]:
+        print("    " + str(position) + ": " + "; ".join(problems))
+
+
+#### Running ####
+
+def timed_run(evaluate, positions):
+    '''Returns the list of values from evaluating positions in order, and the seconds it took.'''
+    start = time.perf_counter()
+    values = [evaluate_safely(evaluate, position) for position in positions]
+    return values, time.perf_counter() - start
+
+def compare(game, positions, engines = None):
+    '''Evaluates positions with each candidate and with its reference engine (see reference_for), returning a report dict per engine: the number of positions, the number of disagreements, the shrunk failing cases, and the speedup over the reference.'''
+    if engines is None:
+        engines = ENGINES
+    reference_runs = {} #reference engine factory -> (values, seconds)
+    reports = {}
+    for name in sorted(engines):
+        if game not in ENGINE_GAMES.get(name, [game]):
+            continue
+        reference = reference_for(name)
+        if reference not in reference_runs:
+            reference_runs[reference] = timed_run(reference(), positions)
+        reference_values, reference_seconds = reference_runs[reference]
+        values, seconds = timed_run(engines[name](), positions)
+        failures = []
+        for position, expected, actual in zip(positions, reference_values, values):
+            if expected != actual:
+                small = shrink(game, engines[name], position, reference)
+                failures.append((small, evaluate_safely(reference(), small), evaluate_safely(engines[name](), small)))
+        reports[name] = {"positions": len(positions), "disagreements": len(failures), "failures": failures, "reference_seconds": reference_seconds, "seconds": seconds, "speedup": reference_seconds / seconds if seconds > 0 else float("inf")}
+    return reports
+
+def print_reports(game, reports):
+    '''Prints out the reports from compare.'''
+    for name in sorted(reports):
+        report = reports[name]
+        status = "OK" if report["disagreements"] == 0 else str(report["disagreements"]) + " DISAGREEMENTS"
+        print(game + " / " + name + ": " + status + " on " + str(report["positions"]) + " positions; speedup x" + format(report["speedup"], ".2f") + " (" + format(report["seconds"], ".3f") + "s vs " + format(report["reference_seconds"], ".3f") + "s)")
+        shown = []
+        for (position, expected, actual) in report["failures"]:
+            if str(position.standardize()) in shown:
+                continue
+            shown.append(str(position.standardize()))
+            print("    Smallest failing case:")
+            print("    " + str(position).replace("\n", "\n    "))
+            print("        reference: *" + str(expected) + "   " + name + ": *" + str(actual))
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Check the candidate engines against the reference GrundySmasher (or the misère reference search).")
+    parser.add_argument("--games", nargs = "*", default = sorted(GAMES), choices = sorted(GAMES))
+    parser.add_argument("--engines", nargs = "*", default = None, help = "candidate engines to check (default: all of them)")
+    parser.add_argument("--random", type = int, default = 0, help = "number of random positions per game (default: check the exhaustive bounded sets instead)")
+    parser.add_argument("--seed", type = int, default = None)
+    args = parser.parse_args(argv)
+    engines = ENGINES if args.engines is None else dict([(name, ENGINES[name]) for name in args.engines])
+    rng = random.Random(args.seed)
+    all_agree = True
+    for game in args.games:
+        exhaustive, random_position, shrinker = GAMES[game]
+        if args.random > 0:
+            positions = [random_position(rng) for i in range(args.random)]
+        else:
+            positions = list(exhaustive())
+        reports = compare(game, positions, engines)
+        print_reports(game, reports)
+        all_agree = all_agree and all([report["disagreements"] == 0 for report in reports.values()])
+        if game == "quantum_nim":
+            if args.random == 0:
+                positions += list(quantumNim.diagonal_positions(4))
+            legacy_report = check_quantum_nim_against_legacy(positions)
+            print_legacy_report(legacy_report)
+            all_agree = all_agree and legacy_report["disagreements"] == 0
+    return all_agree
+
+#run the comparison if we're just executing this file directly and not importing it, exiting with 1 if anything disagreed.
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,109 @@
+'''A two-phase solver: first explore everything reachable from a root into a compact game graph, then find all the Grundy values in one pass over arrays.
+
+The graph stores each canonical position once, as its string (or just its 64-bit fingerprint, to save more memory), and gives it an integer ID when all its options have been explored.  So the options of a position always have smaller IDs than the position itself, and the IDs run in reverse topological order.  The edges are stored in compressed sparse row (CSR) form: the options of position i are targets[offsets[i] : offsets[i+1]].  Only the positions on the current exploration path are ever kept as objects.'''
+
+from array import array
+import json
+
+
+class GameGraph(object):
+    '''The explored graph of positions reachable from a root.
+    attributes: keys (the canonical strings or fingerprints, indexed by ID), ids (key -> ID), offsets and targets (the CSR edges), grundy (the values, or -1 before solving), and root (the root's ID).'''
+
+    def __init__(self, keys, offsets, targets, grundy = None, root = None):
+        self.keys = keys
+        self.ids = dict([(key, i) for i, key in enumerate(keys)])
+        self.offsets = offsets
+        self.targets = targets
+        self.grundy = grundy if grundy is not None else array("i", [-1]) * len(keys)
+        self.root = root if root is not None else len(keys) - 1
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __str__(self):
+        return "GameGraph with " + str(len(self)) + " positions and " + str(len(self.targets)) + " moves"
+
+    def options(self, node):
+        '''Returns the IDs of the options of node.'''
+        return self.targets[self.offsets[node] : self.offsets[node + 1]]
+
+    def solve(self):
+        '''Finds the Grundy value of every position, going through the IDs in order so options are always done first.  Returns the root's value.'''
+        grundy = self.grundy
+        offsets = self.offsets
+        targets = self.targets
+        for node in range(len(self.keys)):
+            seen = set([grundy[target] for target in targets[offsets[node] : offsets[node + 1]]])
+            value = 0
+            while value in seen:
+                value += 1
+            grundy[node] = value
+        return grundy[self.root]
+
+    def key(self, position):
+        '''Returns the key this graph uses for position.'''
+        if isinstance(self.keys, array):
+            return position.fingerprint()
+        return str(position.standardize())
+
+    def value(self, position):
+        '''Returns the Grundy value of position, which must be in the graph.'''
+        return self.grundy[self.ids[self.key(position)]]
+
+    def save(self, path):
+        '''Writes this graph to a JSON file at path.'''
+        with open(path, "w") as file:
+            json.dump({"root": self.root, "keys": list(self.keys), "offsets": self.offsets.tolist(), "targets": self.targets.tolist(), "grundy": self.grundy.tolist()}, file)
+
+    @classmethod
+    def load(cls, path):
+        '''Reads a graph written by save.'''
+        with open(path) as file:
+            data = json.load(file)
+        keys = data["keys"]
+        if len(keys) > 0 and isinstance(keys[0], int):
+            keys = array("Q", keys)
+        return cls(keys, array("q", data["offsets"]), array("l", data["targets"]), array("i", data["grundy"]), data["root"])
+
+
+def explore(root, fingerprints = False):
+    '''Returns the GameGraph of all positions reachable from root, an ImpartialGame.  The exploration is an iterative depth-first search, so it isn't limited by Python's recursion depth.  If fingerprints is True, positions are identified by their 64-bit fingerprints instead of their strings.'''
+    key_of = (lambda position: position.fingerprint()) if fingerprints else str
+    keys = array("Q") if fingerprints else []
+    ids = {}
+    offsets = array("q", [0])
+    targets = array("l")
+    root = root.standardize()
+    on_path = set([key_of(root)])
+    #each frame: [key, iterator over the remaining options, IDs of the options explored so far]
+    stack = [[key_of(root), iter(root.get_options()), []]]
+    while stack:
+        frame = stack[-1]
+        option = next(frame[1], None)
+        if option is None:
+            #all options explored: this position gets the next ID.
+            stack.pop()
+            key = frame[0]
+            ids[key] = len(keys)
+            keys.append(key)
+            targets.extend(frame[2])
+            offsets.append(len(targets))
+            on_path.discard(key)
+            if stack:
+                stack[-1][2].append(ids[key])
+            continue
+        option = option.standardize()
+        key = key_of(option)
+        if key in ids:
+            frame[2].append(ids[key])
+        elif key in on_path:
+            raise ValueError("Found a cycle through " + str(option) + "; impartial games need to end!")
+        else:
+            on_path.add(key)
+            stack.append([key, iter(option.get_options()), []])
+    return GameGraph(keys, offsets, targets)
+
+def solve(root, fingerprints = False):
+    '''Returns the Grundy value of root, found by exploring and then solving its game graph.'''
+    return explore(root, fingerprints).solve()
@@ -0,0 +1,185 @@
+'''Batched option generation and an array-backed memo for Nim positions.
+
+Instead of building a Nim object for every child, positions here are rows: tuples of pile sizes.  A whole option set is a list of rows, canonicalizing is sorting each row, and looking values up is turning each row into an index into a flat array.  (This uses the standard library's array module, so there's nothing extra to install.)'''
+
+from array import array
+import math
+
+import cgt
+
+
+def option_rows(piles):
+    '''Returns the rows of all the children of the Nim position with the given piles, in the same order as Nim.get_options.'''
+    rows = []
+    for i in range(len(piles)):
+        prefix = tuple(piles[:i])
+        suffix = tuple(piles[i+1:])
+        for j in range(piles[i]):
+            rows.append(prefix + (j,) + suffix)
+    return rows
+
+def batch_option_rows(positions):
+    '''Returns the children of many Nim positions (or pile lists) at once, as a flat list of rows plus a list of starts: the children of positions[k] are rows[starts[k] : starts[k+1]].'''
+    rows = []
+    starts = [0]
+    for position in positions:
+        piles = position.piles if isinstance(position, cgt.Nim) else position
+        rows += option_rows(piles)
+        starts.append(len(rows))
+    return rows, starts
+
+def canonical_rows(rows):
+    '''Returns the canonical (sorted) version of each row.'''
+    return [tuple(sorted(row)) for row in rows]
+
+
+class NimTable(object):
+    '''A table holding one value per canonical Nim position with num_piles piles.  Unknown values are -1.
+    Only sorted rows are ever stored, so each one is kept at its rank among all the sorted rows (using the combinatorial number system).  A row's rank doesn't depend on the biggest pile allowed, so the table starts out just big enough for the rows it has been asked about, and grow adds room at the end for bigger piles.  Rows with piles up to max_pile need C(max_pile + num_piles, num_piles) entries; if that would be more than max_entries, the values go in a dict from rank to value instead of a flat array.'''
+
+    def __init__(self, num_piles, max_pile = 0, max_entries = 1 << 22):
+        self.num_piles = num_piles
+        self.max_pile = -1
+        self.max_entries = max_entries
+        #ranks[i][pile] is what pile adds to the rank when it's at index i of a sorted row: C(pile + i, i + 1).
+        self.ranks = [[] for i in range(num_piles)]
+        self.values = array("i")
+        self.grow(max_pile)
+
+    def grow(self, max_pile):
+        '''Makes room for rows with piles of up to max_pile sticks.'''
+        if max_pile <= self.max_pile:
+            return
+        for i in range(self.num_piles):
+            self.ranks[i] += [math.comb(pile + i, i + 1) for pile in range(self.max_pile + 1, max_pile + 1)]
+        size = math.comb(max_pile + self.num_piles, self.num_piles)
+        if isinstance(self.values, dict):
+            pass
+        elif size > self.max_entries:
+            self.values = dict([(index, value) for index, value in enumerate(self.values) if value >= 0])
+        else:
+            self.values.extend(array("i", [-1]) * (size - len(self.values)))
+        self.max_pile = max_pile
+
+    def index(self, row):
+        '''Returns the position of the canonical row in the array.'''
+        index = 0
+        for i in range(len(row)):
+            index += self.ranks[i][row[i]]
+        return index
+
+    def probe(self, rows):
+        '''Returns the stored values (-1 for unknown) of a list of canonical rows.'''
+        values = self.values
+        ranks = self.ranks
+        found = []
+        lookup = values.get if isinstance(values, dict) else None
+        for row in rows:
+            index = 0
+            for i in range(len(row)):
+                index += ranks[i][row[i]]
+            found.append(values[index] if lookup is None else lookup(index, -1))
+        return found
+
+    def store(self, rows, values):
+        '''Stores values for a list of canonical rows.'''
+        for row, value in zip(rows, values):
+            self.values[self.index(row)] = value
+
+    def known(self):
+        '''Returns the number of positions with stored values.'''
+        if isinstance(self.values, dict):
+            return len(self.values)
+        return len(self.values) - self.values.count(-1)
+
+
+class ArrayNimSmasher(object):
+    '''Finds the Grundy values of Nim positions using rows and NimTables (one per number of piles) instead of Nim objects and a dict.  It works a batch of rows at a time: everything reachable is found a layer at a time, then valued in order of the total number of sticks, with one batch_option_rows call and one probe per table for each layer.  It has the same evaluate and has_evaluated methods as GrundySmasher, so it can be handed to a NimberizerVerifier, which then checks whole lists at once with evaluate_many.'''
+
+    def __init__(self, max_pile = 15, max_entries = 1 << 22):
+        '''max_pile is the largest pile size this can handle.  Each table only grows as big as the piles it's actually asked about, and max_entries is the most entries a table can have before switching to a dict.'''
+        self.max_pile = max_pile
+        self.max_entries = max_entries
+        self.tables = {} #number of piles -> NimTable
+
+    def __str__(self):
+        return "I am an ArrayNimSmasher who has evaluated " + str(sum([table.known() for table in self.tables.values()])) + " positions!"
+
+    def table_for(self, num_piles):
+        '''Returns the table for rows with num_piles piles, creating it if needed.'''
+        if num_piles not in self.tables:
+            self.tables[num_piles] = NimTable(num_piles, 0, self.max_entries)
+        return self.tables[num_piles]
+
+    def to_rows(self, positions):
+        '''Returns the canonical rows of a list of Nim positions (or pile lists), making sure the tables have room for them.  Raises a ValueError if a pile is too big.'''
+        rows = canonical_rows([position.piles if isinstance(position, cgt.Nim) else position for position in positions])
+        for row in rows:
+            if len(row) > 0 and row[-1] > self.max_pile:
+                raise ValueError("Pile of size " + str(row[-1]) + " is bigger than this smasher's max_pile, " + str(self.max_pile) + ".")
+        #options never have bigger piles, so making room for these rows is enough for everything they reach.
+        for num_piles, indices in group_by_length(rows).items():
+            self.table_for(num_piles).grow(max([rows[i][-1] if num_piles > 0 else 0 for i in indices]))
+        return rows
+
+    def probe(self, rows):
+        '''Returns the stored values (-1 for unknown) of a list of canonical rows, which may have different numbers of piles.'''
+        values = [-1] * len(rows)
+        for num_piles, indices in group_by_length(rows).items():
+            found = self.table_for(num_piles).probe([rows[i] for i in indices])
+            for i, value in zip(indices, found):
+                values[i] = value
+        return values
+
+    def store(self, rows, values):
+        '''Stores values for a list of canonical rows, which may have different numbers of piles.'''
+        for num_piles, indices in group_by_length(rows).items():
+            self.table_for(num_piles).store([rows[i] for i in indices], [values[i] for i in indices])
+
+    def evaluate(self, position):
+        '''Returns the Grundy value of position, a Nim instance (or a list of piles).'''
+        return self.evaluate_many([position])[0]
+
+    def evaluate_many(self, positions):
+        '''Returns the Grundy values of a list of Nim positions (or pile lists).'''
+        rows = self.to_rows(positions)
+        self.solve(rows)
+        return self.probe(rows)
+
+    def solve(self, rows):
+        '''Stores the values of the canonical rows and of everything they can reach.  This doesn't recurse, so it isn't limited by Python's recursion depth.'''
+        layers = {} #total number of sticks -> the unknown rows with that total
+        seen = set()
+        frontier = self.unknown_rows(rows, seen)
+        while frontier:
+            for row in frontier:
+                layers.setdefault(sum(row), []).append(row)
+            children, starts = batch_option_rows(frontier)
+            frontier = self.unknown_rows(canonical_rows(children), seen)
+        #options always have fewer sticks, so going up by total means their values are already stored.
+        for total in sorted(layers):
+            layer = layers[total]
+            children, starts = batch_option_rows(layer)
+            values = self.probe(canonical_rows(children))
+            self.store(layer, [cgt.mex(set(values[starts[k] : starts[k+1]])) for k in range(len(layer))])
+
+    def unknown_rows(self, rows, seen):
+        '''Returns the rows without stored values that aren't in seen, without repeats, adding them to seen.'''
+        unknown = []
+        for row, value in zip(rows, self.probe(rows)):
+            if value < 0 and row not in seen:
+                seen.add(row)
+                unknown.append(row)
+        return unknown
+
+    def has_evaluated(self, position):
+        '''Returns whether the value of position is already stored.'''
+        return self.probe(self.to_rows([position]))[0] >= 0
+
+
+def group_by_length(rows):
+    '''Returns a dict from each row length to the indices of the rows with that length.'''
+    groups = {}
+    for i in range(len(rows)):
+        groups.setdefault(len(rows[i]), []).append(i)
+    return groups
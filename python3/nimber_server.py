@@ -0,0 +1,211 @@
+'''A small local server that answers Grundy value queries from one long-lived (warm) GrundySmasher.
+
+Clients send one JSON object per line and get one JSON object per line back, in whatever order the answers are ready.  Requests look like:
+    {"id": 1, "game": "nim", "piles": [3, 4, 5]}
+    {"id": 2, "game": "quantum_nim", "nims": [[4, 5], [5, 4]], "width": 2}
+    {"id": 3, "game": "avoid_true", "clauses": [[0, 1], [1, 2]], "falses": [0, 1, 2], "trues": []}
+(A quantum_nim request without a width gets the usual width of 2.)  Answers look like:
+    {"id": 1, "nimber": 2}
+Positions that the smasher already knows are answered straight away.  Everything else is collected into batches, with identical positions that are already being worked on sharing one evaluation.  Requests with piles over --max-pile are refused, and positions that take longer than --max-seconds get an error (asking again carries on from where the search stopped).
+
+Run it with either:
+    python3 nimber_server.py --port 8765
+    python3 nimber_server.py --unix /tmp/nimbers.sock'''
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import time
+
+import cgt
+from position_json import position_from_json
+
+
+class NimberServer(object):
+    '''Answers nimber requests with one shared GrundySmasher, batching the positions it doesn't know yet.'''
+
+    def __init__(self, smasher = None, batch_window = 0.002, max_batch = 256, max_seconds = 10.0, max_pile = 1000):
+        '''batch_window is how many seconds to wait for more requests before starting a batch; max_batch is the most positions evaluated in one go.
+        There's only one worker, so one huge request could hold up everyone else.  To stop that, requests with a pile bigger than max_pile are turned away, and a position that takes more than max_seconds gets an error instead of a nimber.  Its finished work stays in the memo, so asking again carries on where it stopped.  (Either limit can be None; max_seconds has to be None for a smasher without budgeted searches, like a ConcurrentGrundySmasher.)'''
+        self.smasher = cgt.GrundySmasher() if smasher is None else smasher
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_seconds = max_seconds
+        self.max_pile = max_pile
+        self.in_flight = {} #standardized string -> future for the positions queued or being evaluated
+        self.pending = [] #(standardized position, string) pairs waiting for the next batch
+        self.stats = {"requests": 0, "warm_hits": 0, "shared": 0, "batches": 0, "evaluated": 0}
+        #GrundySmasher isn't thread-safe, so all the real work happens on one worker thread.
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers = 1)
+        self.wakeup = None
+        self.batcher = None
+
+    def __str__(self):
+        return "I am a NimberServer who has answered " + str(self.stats["requests"]) + " requests using " + str(self.smasher)
+
+    async def nimber(self, position):
+        '''Returns the nimber of position, waiting for a batch if it isn't already known.'''
+        self.stats["requests"] += 1
+        standard = position.standardize()
+        if standard in self.smasher.memo:
+            self.stats["warm_hits"] += 1
+            return self.smasher.normal_value(self.smasher.memo[standard])
+        key = str(standard)
+        if key in self.in_flight:
+            self.stats["shared"] += 1
+            return await asyncio.shield(self.in_flight[key])
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        self.pending.append((standard, key))
+        self._start_batcher()
+        self.wakeup.set()
+        return await asyncio.shield(future)
+
+    def _start_batcher(self):
+        '''Starts the batching task the first time it's needed.'''
+        if self.batcher is None:
+            self.wakeup = asyncio.Event()
+            self.batcher = asyncio.get_running_loop().create_task(self._run_batches())
+
+    async def _run_batches(self):
+        '''Forever: waits for pending positions, lets a batch fill up, then evaluates it on the worker thread.'''
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.wakeup.wait()
+            if len(self.pending) < self.max_batch:
+                await asyncio.sleep(self.batch_window)
+            batch = self.pending[:self.max_batch]
+            self.pending = self.pending[self.max_batch:]
+            if len(self.pending) == 0:
+                self.wakeup.clear()
+            self.stats["batches"] += 1
+            self.stats["evaluated"] += len(batch)
+            positions = [standard for (standard, key) in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self._evaluate_batch, positions)
+            except Exception as error:
+                for (standard, key) in batch:
+                    self.in_flight.pop(key).set_exception(error)
+                continue
+            for (standard, key), (value, error) in zip(batch, results):
+                if error is None:
+                    self.in_flight.pop(key).set_result(value)
+                else:
+                    self.in_flight.pop(key).set_exception(error)
+
+    def _evaluate_batch(self, positions):
+        '''Evaluates a list of positions, returning a (value, None) or (None, error) pair for each one, so a bad position only spoils its own answer.  Runs on the worker thread.'''
+        results = []
+        for position in positions:
+            try:
+                results.append((self.evaluate(position), None))
+            except Exception as error:
+                results.append((None, error))
+        return results
+
+    def evaluate(self, position):
+        '''Returns the nimber of position, raising a TimeoutError if it takes more than max_seconds.  Runs on the worker thread.'''
+        if self.max_seconds is None:
+            return self.smasher.evaluate(position)
+        result = self.smasher.evaluate(position, deadline = time.time() + self.max_seconds)
+        if isinstance(result, cgt.SearchHandle):
+            raise TimeoutError("Gave up after " + str(self.max_seconds) + " seconds; ask again to carry on from there.")
+        return result
+
+    async def answer(self, request):
+        '''Returns the response dict for one decoded request.  Every request gets an answer: anything that goes wrong with its position becomes an "error" entry.'''
+        response = {"id": request.get("id")}
+        try:
+            position = position_from_json(request, self.max_pile).standardize()
+        except Exception as error:
+            response["error"] = "Bad position: " + repr(error)
+            return response
+        try:
+            response["nimber"] = await self.nimber(position)
+        except RecursionError:
+            response["error"] = "Position is too deep to evaluate."
+        except Exception as error:
+            response["error"] = "Couldn't evaluate position: " + repr(error)
+        return response
+
+    async def handle_client(self, reader, writer):
+        '''Serves one connection, writing each answer back as soon as it's ready.'''
+        tasks = set()
+
+        async def respond(request):
+            response = await self.answer(request)
+            writer.write((json.dumps(response) + "\n").encode())
+            await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip() == b"":
+                    continue
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("requests must be JSON objects")
+                except ValueError as error:
+                    writer.write((json.dumps({"id": None, "error": "Bad request: " + str(error)}) + "\n").encode())
+                    continue
+                task = asyncio.create_task(respond(request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions = True)
+        finally:
+            writer.close()
+
+    async def serve(self, host = "127.0.0.1", port = 8765, unix_path = None):
+        '''Serves forever on a Unix socket (if unix_path is given) or on host:port.'''
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(self.handle_client, path = unix_path)
+        else:
+            server = await asyncio.start_server(self.handle_client, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+async def query(requests, host = "127.0.0.1", port = 8765, unix_path = None):
+    '''Sends a list of request dicts to a running server and returns the responses, sorted back into request order by id.'''
+    if unix_path is not None:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    for request in requests:
+        writer.write((json.dumps(request) + "\n").encode())
+    await writer.drain()
+    responses = {}
+    while len(responses) < len(requests):
+        line = await reader.readline()
+        if not line:
+            break
+        response = json.loads(line)
+        responses[response.get("id")] = response
+    writer.close()
+    return [responses.get(request.get("id")) for request in requests]
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Serve Grundy values from a warm GrundySmasher.")
+    parser.add_argument("--host", default = "127.0.0.1")
+    parser.add_argument("--port", type = int, default = 8765)
+    parser.add_argument("--unix", default = None, help = "path of a Unix socket to listen on instead of TCP")
+    parser.add_argument("--batch-window", type = float, default = 0.002, help = "seconds to wait for a batch to fill")
+    parser.add_argument("--max-seconds", type = float, default = 10.0, help = "seconds to spend on one position before giving up on it")
+    parser.add_argument("--max-pile", type = int, default = 1000, help = "largest pile size to accept")
+    parser.add_argument("--verbose", action = "store_true")
+    args = parser.parse_args()
+    server = NimberServer(cgt.GrundySmasher(args.verbose), batch_window = args.batch_window, max_seconds = args.max_seconds, max_pile = args.max_pile)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        print(server)
+
+#run the server if we're just executing this file directly and not importing it.
+if __name__ == "__main__":
+    main()
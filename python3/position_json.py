@@ -0,0 +1,62 @@
+'''Turning positions into JSON-ready dicts and back, for the nimber server and the sweep runner.  The dicts look like:
+    {"game": "nim", "piles": [3, 4, 5]}
+    {"game": "quantum_nim", "nims": [[4, 5], [5, 4]], "width": 2}
+    {"game": "avoid_true", "clauses": [[0, 1], [1, 2]], "falses": [0, 1, 2], "trues": []}
+(A quantum_nim dict without a width gets the usual width of 2.)'''
+
+import json
+
+import cgt
+from quantumNim import QuantumNim
+from avoid_true import AvoidTrue
+
+
+def position_from_json(description, max_pile = None):
+    '''Returns the ImpartialGame described by description, a dict decoded from a JSON request.  Raises a ValueError if the description doesn't make sense, or if max_pile is given and a pile (or AvoidTrue variable) is bigger than it.'''
+    game = description.get("game")
+    if game == "nim":
+        return cgt.Nim(naturals_from_json(description["piles"], "piles", max_pile))
+    elif game == "quantum_nim":
+        nims = description["nims"]
+        if not isinstance(nims, list) or len(nims) == 0:
+            raise ValueError("A QuantumNim position needs a list of at least one nim.")
+        pile_lists = [naturals_from_json(piles, "nim", max_pile) for piles in nims]
+        if len(pile_lists[0]) == 0:
+            raise ValueError("QuantumNim nims need at least one pile.")
+        if any([len(piles) != len(pile_lists[0]) for piles in pile_lists]):
+            raise ValueError("All the nims in a QuantumNim position need the same number of piles.")
+        width = description.get("width", 2)
+        if not is_natural(width) or width < 1:
+            raise ValueError("A QuantumNim width should be a positive integer, not " + json.dumps(width) + ".")
+        return QuantumNim([cgt.Nim(piles) for piles in pile_lists], width)
+    elif game == "avoid_true":
+        if not isinstance(description["clauses"], list):
+            raise ValueError("AvoidTrue clauses should be a list of lists of variables.")
+        clauses = [naturals_from_json(clause, "clause", max_pile) for clause in description["clauses"]]
+        return AvoidTrue(clauses, naturals_from_json(description.get("falses", []), "falses", max_pile), naturals_from_json(description.get("trues", []), "trues", max_pile))
+    else:
+        raise ValueError("Unknown game: " + str(game))
+
+def is_natural(value):
+    '''Returns whether value (decoded from JSON) is a non-negative integer.'''
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+def naturals_from_json(values, name, max_value = None):
+    '''Returns values (decoded from JSON) as a list, raising a ValueError unless it's a list of non-negative integers, none bigger than max_value (if given).'''
+    if not isinstance(values, list) or not all([is_natural(value) for value in values]):
+        raise ValueError(name + " should be a list of non-negative integers, not " + json.dumps(values) + ".")
+    if max_value is not None and len(values) > 0 and max(values) > max_value:
+        raise ValueError(name + " can't have anything bigger than " + str(max_value) + ".")
+    return list(values)
+
+
+def position_to_json(position):
+    '''Returns a dict describing position that position_from_json can turn back into an equal position.'''
+    if isinstance(position, cgt.Nim):
+        return {"game": "nim", "piles": list(position.piles)}
+    elif isinstance(position, QuantumNim):
+        return {"game": "quantum_nim", "nims": [list(piles) for piles in position.pileTuples], "width": position.width}
+    elif isinstance(position, AvoidTrue):
+        return {"game": "avoid_true", "clauses": position.clauses, "falses": position.false_variables, "trues": position.true_variables}
+    else:
+        raise ValueError("Don't know how to describe a " + type(position).__name__ + " in JSON.")
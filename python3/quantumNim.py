@@ -1,201 +1,282 @@
-'''For testing Quantum Nim (2-width supermoves).
+'''For testing Quantum Nim (2-width supermoves by default, or wider).
 author: Kyle Burke'''
 
 import cgt
-import copy
+import itertools
 import time
 import math
 
-def toQNimString(nim):
-    s = "("
-    for pile in nim.piles:
-        s += str(pile) + ", "
-    s = s[: len(s)-2]
-    return s + ")"
-
-def nimDominates(a, b):
-    '''Returns true if Nim position a "dominates" Nim position b, which means that each pile of a is at least as big as each pile of b.'''
-    if len(a.piles) != len(b.piles):
-        print("Trying to test domination of two Nims that have different numbers of piles!  a:" + str(a) + "  b: " + str(b))
-        return False
-    for i in range(len(a.piles)):
-        if (a.piles[i] < b.piles[i]):
+def pilesDominate(a, b):
+    '''Returns true if the pile tuple a "dominates" the pile tuple b, which means that each pile of a is at least as big as the same pile of b.'''
+    for i in range(len(a)):
+        if a[i] < b[i]:
             return False
     return True
 
+def minimalPiles(pileTuples):
+    '''Returns the pile tuples that don't dominate any of the others, keeping the first copy of any repeats and otherwise keeping the original order.'''
+    minimal = []
+    for i in range(len(pileTuples)):
+        maybeDominated = pileTuples[i]
+        dominated = False
+        for j in range(len(pileTuples)):
+            other = pileTuples[j]
+            if (i != j) and pilesDominate(maybeDominated, other):
+                if (maybeDominated == other) and (j > i):
+                    pass #this is the first copy, so we keep it
+                else:
+                    dominated = True
+                    break
+        if not dominated:
+            minimal.append(maybeDominated)
+    return minimal
+
+def mergeMinimal(a, b):
+    '''Returns minimalPiles(a + b), where a and b are both lists of pile tuples that are already minimal.  Since neither list can knock out its own members, only comparisons across the two lists are needed.'''
+    keptA = []
+    for x in a:
+        for y in b:
+            if x != y and pilesDominate(x, y):
+                break
+        else:
+            keptA.append(x)
+    keptB = []
+    for y in b:
+        for x in a:
+            if pilesDominate(y, x):
+                break
+        else:
+            keptB.append(y)
+    return keptA + keptB
+
+
+'''Tags for the Zobrist keys of QuantumNim piles and widths.'''
+QNIM_TAG = 2
+QNIM_WIDTH_TAG = 3
 
 class QuantumNim(cgt.ImpartialGame):
     '''Models a Quantum Nim position, i.e., a superposition of nims.
-    attributes: nims, the list of Nim objects in the superposition.'''
+    attributes: nims, the list of Nim objects in the superposition, and width, the largest number of classical moves a supermove can superpose (2 by default).'''
     
-    def __init__(self, nims):
+    def __init__(self, nims, width = 2):
         '''Constructor.  nims is a list of Nim objects.'''
         if len(nims) == 0:
             print("Can't create a nim object with zero nims!")
-        optionNims = copy.deepcopy(nims)
-        slimmedOptions = [] #a shorter list of non-dominated positions
-        for i in range(len(optionNims)):
-            maybeDominated = optionNims[i]
-            dominated = False
-            for j in range(len(optionNims)):
-                other = optionNims[j]
-                if (i != j) and (nimDominates(maybeDominated, other)):
-                    #check to see whether they're equal and whether one already exists
-                    if (maybeDominated == other) and (not maybeDominated in slimmedOptions):
-                        pass #we do want to maybe add it
-                    else:
-                        dominated = True
-            if not dominated:
-                slimmedOptions.append(maybeDominated)
-        self.nims = slimmedOptions
+        self.width = width
+        self.setPiles(minimalPiles([tuple(nim.piles) for nim in nims]))
+        
+    @classmethod
+    def fromMinimalPiles(cls, pileTuples, width = 2):
+        '''Returns a new QuantumNim from a list of pile tuples that are already known to not dominate each other.  This skips the domination filter, so it's much faster than the constructor.'''
+        qNim = cls.__new__(cls)
+        qNim.width = width
+        qNim.setPiles(pileTuples)
+        return qNim
         
+    def setPiles(self, pileTuples):
+        '''Sets the superposition to be the (minimal) pile tuples given.'''
+        self.pileTuples = pileTuples
+        self._nims = None
+        self._fingerprint = None
+        
+    @property
+    def nims(self):
+        '''The list of Nim objects in the superposition.  They're only built when someone asks for them, since most options are never looked at this way.'''
+        if self._nims is None:
+            self._nims = [cgt.Nim(list(piles)) for piles in self.pileTuples]
+        return self._nims
         
     def __str__(self):
-        if (len(self.nims) == 1):
-            return toQNimString(self.nims[0])
-        s = "<"
-        for nim in self.nims:
-            s += toQNimString(nim) + " | "
-        s = s[: len(s)-3]
-        return s + ">"
+        nimStrings = ["(" + ", ".join([str(pile) for pile in piles]) + ")" for piles in self.pileTuples]
+        if (len(nimStrings) == 1):
+            s = nimStrings[0]
+        else:
+            s = "<" + " | ".join(nimStrings) + ">"
+        if self.width != 2:
+            s += " (width " + str(self.width) + ")"
+        return s
         
     def get_options(self):
-        '''Returns all options from this position.'''
+        '''Returns all options from this position.  Each classical move is computed once; supermoves are built by merging those results in a depth-first walk, so each partial superposition is shared by all the supermoves that extend it.'''
         #generate the list of maximum pile sizes
-        maxes = copy.deepcopy(self.nims[0].piles)
-        #print("*******")
-        #print("#nims:", len(self.nims))
-        #print("nims:", self.nims[0])
-        #print("self:", self)
-        #print("pre maxes:", maxes)
-        for nim in self.nims:
-            #print(nim.piles)
-            for i in range(len(nim.piles)):
-                maxes[i] = max(maxes[i], nim.piles[i])
+        maxes = list(self.pileTuples[0])
+        for piles in self.pileTuples:
+            for i in range(len(piles)):
+                maxes[i] = max(maxes[i], piles[i])
         
-        options = []
-        #print("self (B):", self)
-        #print("maxes:", maxes)
-        #generate all possible moves.
         #first the moves from making one move
+        classical = [] #classical[i] is a list of (sticks, resulting piles) pairs for pile i.
+        options = []
         for i in range(len(maxes)):
-            size = maxes[i]
-            for sticks in range(1, size+1):
-                options.append(self.getOptionFromClassicalMove(i, sticks))
+            results = []
+            for sticks in range(1, maxes[i]+1):
+                resulting = self.classicalPiles(i, sticks)
+                results.append((sticks, resulting))
+                options.append(QuantumNim.fromMinimalPiles(resulting, self.width))
+            classical.append(results)
                 
-        #print(len(options), "so far...")
-        #print("self (C):", self)
-        #now the moves from making a quantum width-2 move:
-        for iA in range(len(maxes)-1):
-            sizeA = maxes[iA]
-            for sticksA in range(1, sizeA+1):
-                for iB in range(iA + 1, len(maxes)):
-                    sizeB = maxes[iB]
-                    for sticksB in range(1, sizeB+1):
-                        options.append(self.getOptionFromQuantumMove(iA, sticksA, iB, sticksB))
-        #print(len(options), "options for", str(self))
+        #now the quantum moves, superposing up to width classical moves on different piles
+        def extend(firstPile, superposition, movesLeft):
+            for i in range(firstPile, len(maxes)):
+                for (sticks, resulting) in classical[i]:
+                    merged = mergeMinimal(superposition, resulting)
+                    options.append(QuantumNim.fromMinimalPiles(merged, self.width))
+                    if movesLeft > 1:
+                        extend(i + 1, merged, movesLeft - 1)
+        
+        if self.width >= 2:
+            for i in range(len(maxes)-1):
+                for (sticks, resulting) in classical[i]:
+                    extend(i + 1, resulting, self.width - 1)
         return options
     
     def __eq__(self, other):
-        """Returns whether self equals other."""
-        a = self.standardize()
-        b = other.standardize()
-        return str(a) == str(b)
+        """Returns whether self equals other.  The (cached) fingerprints are compared first, and memo keys are already standardized, so a memo hit is usually settled by comparing the pile tuples directly."""
+        if not isinstance(other, QuantumNim) or self.width != other.width or self.fingerprint() != other.fingerprint():
+            return False
+        if self.pileTuples == other.pileTuples:
+            return True
+        return self.standardize().pileTuples == other.standardize().pileTuples
     
     def __hash__(self):
         return super().__hash__()
     
     def standardize(self):
-        '''Returns a new version of this with the nims ordered (and maybe all flipped).'''
-        #print("In standardize...")
-        copyNims = copy.deepcopy(self.nims)
-        copyNims.sort(key = str)
-        clone = QuantumNim(copyNims)
-        #print("copyNims (sorted):    ", clone)
-        #check the reverses
-        flippedNims = []
-        for nim in self.nims:
-            flippedNims.append(cgt.Nim([nim.piles[1], nim.piles[0]]))
-        flippedNims.sort(key = str)
-        flipped = QuantumNim(flippedNims)
-        #print("flippedNims (sorted): ", flipped)
-        if str(clone) < str(flipped):
-            #print("returning copyNims")
-            return clone
-        else:
-            #print("returning flippedNims")
-            return flipped
+        '''Returns a new version of this with the nims ordered and the piles permuted (flipped, with two piles) to get the smallest string.'''
+        best = None
+        for permutation in itertools.permutations(range(len(self.pileTuples[0]))):
+            permuted = [tuple(piles[p] for p in permutation) for piles in self.pileTuples]
+            permuted.sort(key = lambda piles: str(list(piles)))
+            candidate = QuantumNim.fromMinimalPiles(permuted, self.width)
+            if best is None or str(candidate) <= str(best):
+                best = candidate
+        best._fingerprint = self._fingerprint #equal positions have the same fingerprint
+        return best
         
+    def fingerprint(self):
+        '''Returns a Zobrist fingerprint that doesn't depend on the order of the nims or of the piles.  Each nim's keys (one per pile index and size) are summed and scrambled, the nims are summed, and the smallest sum over all pile permutations is used.  This is computed straight from the pile tuples, which costs about as much as building the position did.'''
+        if self._fingerprint is None:
+            best = None
+            for permutation in itertools.permutations(range(len(self.pileTuples[0]))):
+                total = 0
+                for piles in self.pileTuples:
+                    nimKey = 0
+                    for i in range(len(permutation)):
+                        nimKey += cgt.zobrist_key(QNIM_TAG, i, piles[permutation[i]])
+                    total += cgt.splitmix64(nimKey & cgt.MASK64)
+                if best is None or (total & cgt.MASK64) < best:
+                    best = total & cgt.MASK64
+            self._fingerprint = best ^ cgt.zobrist_key(QNIM_WIDTH_TAG, self.width)
+        return self._fingerprint
         
+    def classicalPiles(self, pileI, sticksTaken):
+        '''Returns the pile tuples left after taking sticksTaken from pile pileI.  Nims that are too small for the move disappear.  Taking the same number of sticks from every remaining nim can't create any new domination, so the result is still minimal.'''
+        resulting = []
+        for piles in self.pileTuples:
+            if piles[pileI] >= sticksTaken:
+                resulting.append(piles[:pileI] + (piles[pileI] - sticksTaken,) + piles[pileI+1:])
+        return resulting
         
     def getOptionFromClassicalMove(self, pileI, sticksTaken):
         '''Returns the QuantumNim position created from one (classical) move.''' 
-        optionNims = []
-        for nim in self.nims:
-            if nim.piles[pileI] >= sticksTaken:
-                optionNim = copy.deepcopy(nim)
-                optionNim.piles[pileI] -= sticksTaken
-                optionNims.append(optionNim)
-        return QuantumNim(optionNims)
+        return QuantumNim.fromMinimalPiles(self.classicalPiles(pileI, sticksTaken), self.width)
     
     def getOptionFromQuantumMove(self, pileIA, sticksA, pileIB, sticksB):
         '''Returns the Quantum Nim position created from a quantum move.'''
-        qNimA = self.getOptionFromClassicalMove(pileIA, sticksA)
-        qNimB = self.getOptionFromClassicalMove(pileIB, sticksB)
-        bothNims = copy.deepcopy(qNimA.nims) + copy.deepcopy(qNimB.nims)
-        bothNim = QuantumNim(bothNims)
-        return bothNim
+        merged = mergeMinimal(self.classicalPiles(pileIA, sticksA), self.classicalPiles(pileIB, sticksB))
+        return QuantumNim.fromMinimalPiles(merged, self.width)
         
       
 
 
-smasher = cgt.GrundySmasher()
+class OnePileNimberizer(cgt.Nimberizer):
+    '''Nimberizes QuantumNim positions where only one pile has any sticks left.  Then no quantum moves are possible and (after removing dominated nims) there's just a single classical nim, so the value is the number of sticks in that pile.
+    Note: single-nim positions with two non-empty piles are NOT plain Nim, since quantum moves are still available there.  (E.g. (3, 3) is *5.)'''
+    
+    def applies_to(self, qNim):
+        '''Returns whether qNim is a single nim with at most one non-empty pile.  This runs on every new position a smasher meets, so it looks at the pile tuples instead of building Nim objects.'''
+        if len(qNim.pileTuples) != 1:
+            return False
+        return sum([1 for pile in qNim.pileTuples[0] if pile > 0]) <= 1
+    
+    def nimberize(self, qNim):
+        '''Returns the size of the one non-empty pile (or 0).'''
+        return sum(qNim.pileTuples[0])
+    
+    def misere_nimberize(self, qNim):
+        '''Returns the misère value of the one pile: the size, except that 0 and 1 swap.'''
+        size = sum(qNim.pileTuples[0])
+        return size ^ 1 if size <= 1 else size
 
-if False:      
-    nimA = cgt.Nim([4, 5])
-    nimB = cgt.Nim([5, 4])
-    nims = [nimA, nimB]
-    qNim = QuantumNim(nims)
-    x = smasher.evaluate(qNim)
-    print(qNim, "evaluates to *" + str(x))
-        
-if False:
-    nimA = cgt.Nim([7, 8])
-    nimB = cgt.Nim([8, 7])
-    nims = [nimA, nimB]
-    qNim = QuantumNim(nims)
-    x = smasher.evaluate(qNim)
-    print(qNim, "evaluates to *" + str(x))
         
-if True:
-    nimA = cgt.Nim([4, 5])
-    #nimB = cgt.Nim([8, 7])
-    nims = [nimA]
-    qNim = QuantumNim(nims)
-    x = smasher.evaluate(qNim)
-    print(qNim, "evaluates to *" + str(x))
+def add_oracles(smasher):
+    '''Registers the proven QuantumNim formulas with smasher, a GrundySmasher.'''
+    nimberizer = OnePileNimberizer()
+    smasher.add_oracle(nimberizer, QuantumNim, nimberizer.applies_to)
+    smasher.add_oracle(cgt.NimNimberizer(), cgt.Nim)
+
+
+def classical_positions_by_total(max_total):
+    '''Generates (total, position) pairs for the classical two-pile positions (a, b), with a <= b, in order of the total number of sticks.'''
+    for total in range(max_total + 1):
+        for a in range(total // 2 + 1):
+            yield (total, QuantumNim([cgt.Nim([a, total - a])]))
+
+
+def diagonal_positions(biggest):
+    '''Generates the classical positions (i, i) for i from 0 up to biggest, as single-nim QuantumNims.'''
+    for i in range(0, biggest + 1):
+        yield QuantumNim([cgt.Nim([i,i])])
+
 
+def run_experiments(biggest = 6):
+    '''Evaluates a few sample positions and then the (i, i) positions up to biggest, printing everything out.'''
+    smasher = cgt.GrundySmasher()
+    add_oracles(smasher)
 
+    if False:      
+        nimA = cgt.Nim([4, 5])
+        nimB = cgt.Nim([5, 4])
+        nims = [nimA, nimB]
+        qNim = QuantumNim(nims)
+        x = smasher.evaluate(qNim)
+        print(qNim, "evaluates to *" + str(x))
+            
+    if False:
+        nimA = cgt.Nim([7, 8])
+        nimB = cgt.Nim([8, 7])
+        nims = [nimA, nimB]
+        qNim = QuantumNim(nims)
+        x = smasher.evaluate(qNim)
+        print(qNim, "evaluates to *" + str(x))
+            
+    if True:
+        nimA = cgt.Nim([4, 5])
+        #nimB = cgt.Nim([8, 7])
+        nims = [nimA]
+        qNim = QuantumNim(nims)
+        x = smasher.evaluate(qNim)
+        print(qNim, "evaluates to *" + str(x))
 
-biggest = 6
-start = time.time()
-prev_t = start
-for i in range(0, biggest + 1):
-    nims = [cgt.Nim([i,i])]
-    qNim = QuantumNim(nims)
-    x = smasher.evaluate(qNim)
-    print(qNim, "has value *" + str(x), end = "")
-    next_t = time.time()
-    print("   (That took less than", math.ceil(next_t - prev_t), "seconds.)")
-    prev_t = next_t
+    start = time.time()
+    prev_t = start
+    for qNim in diagonal_positions(biggest):
+        x = smasher.evaluate(qNim)
+        print(qNim, "has value *" + str(x), end = "")
+        next_t = time.time()
+        print("   (That took less than", math.ceil(next_t - prev_t), "seconds.)")
+        prev_t = next_t
 
-#qNim = QuantumNim([cgt.Nim([1,0])])
+    #qNim = QuantumNim([cgt.Nim([1,0])])
 
-#cgt.print_impartial_position_and_options(qNim, smasher)
+    #cgt.print_impartial_position_and_options(qNim, smasher)
 
-print("******  Printing the zeroes! ******")
+    print("******  Printing the zeroes! ******")
 
-smasher.print_zeroes()
+    smasher.print_zeroes()
+    print(smasher.get_stats())
 
 
-#print(nimDominates(cgt.Nim([1,1]), cgt.Nim([1,1])))
+#run the experiments if we're just executing this file directly and not importing it.
+if __name__ == "__main__":
+    run_experiments()
@@ -0,0 +1,126 @@
+'''Command-line runner for the QuantumNim and AvoidTrue sweeps, split into shards so they can run on separate machines.
+
+Each sweep is a fixed, ordered list of positions; shard k/N evaluates exactly the positions whose index is k mod N.  Every result line includes that index, so shard outputs can be merged later just by sorting on it.  Examples:
+    python3 sweep.py quantum-nim --biggest 6
+    python3 sweep.py avoid-true-3cnf --shard 0/8 --format csv > shard0.csv'''
+
+import argparse
+import csv
+import itertools
+import json
+import sys
+import time
+
+import cgt
+import quantumNim
+import avoid_true
+from position_json import position_to_json
+
+
+def quantum_nim_items(args):
+    '''Returns the pile sizes i of the QuantumNim (i, i) series.'''
+    return range(args.biggest + 1)
+
+def quantum_nim_position(i):
+    '''Returns the classical QuantumNim position (i, i).'''
+    return quantumNim.QuantumNim([cgt.Nim([i, i])])
+
+def two_cnf_items(args):
+    '''Generates the clause lists of the 2-CNF AvoidTrue sweep.'''
+    return avoid_true.two_cnf_clause_lists(list(range(1, args.num_vars + 1)))
+
+def three_cnf_items(args):
+    '''Generates the clause lists of the 3-CNF AvoidTrue sweep.'''
+    return avoid_true.three_cnf_clause_lists(list(range(1, args.num_vars + 1)))
+
+def avoid_true_position(clauses):
+    '''Returns the AvoidTrue position with the given clauses and no variables set yet.'''
+    return avoid_true.AvoidTrue(clauses, [], [])
+
+'''Maps each sweep name to a pair: a function that generates the sweep's cheap descriptions of its positions (pile sizes or clause lists), and a function that builds the position from one description.  Shards pick their descriptions first, so nobody builds positions that belong to other shards.'''
+SWEEPS = {
+    "quantum-nim": (quantum_nim_items, quantum_nim_position),
+    "avoid-true-2cnf": (two_cnf_items, avoid_true_position),
+    "avoid-true-3cnf": (three_cnf_items, avoid_true_position),
+}
+
+
+def parse_shard(text):
+    '''Turns "k/N" into the pair (k, N), raising an ArgumentTypeError if it isn't a valid shard.'''
+    try:
+        k, n = [int(part) for part in text.split("/")]
+    except ValueError:
+        raise argparse.ArgumentTypeError("shard should look like k/N, e.g. 0/4")
+    if n < 1 or not (0 <= k < n):
+        raise argparse.ArgumentTypeError("shard k/N needs 0 <= k < N")
+    return (k, n)
+
+def shard_of(items, shard):
+    '''Generates the (index, item) pairs of items that belong to shard, a (k, N) pair.  The other items are skipped without being looked at.'''
+    k, n = shard
+    return zip(itertools.count(k, n), itertools.islice(items, k, None, n))
+
+
+class JsonLinesWriter(object):
+    '''Writes one JSON object per result.'''
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, row):
+        self.stream.write(json.dumps(row) + "\n")
+        self.stream.flush()
+
+class CsvWriter(object):
+    '''Writes one CSV row per result, with the position as a JSON string in its own column.'''
+
+    FIELDS = ["sweep", "index", "nimber", "seconds", "position"]
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.writer = csv.DictWriter(stream, fieldnames = self.FIELDS)
+        self.writer.writeheader()
+
+    def write(self, row):
+        row = dict(row)
+        row["position"] = json.dumps(row["position"])
+        self.writer.writerow(row)
+        self.stream.flush()
+
+
+def run_sweep(name, args, writer, smasher = None):
+    '''Evaluates this shard of the named sweep, handing each result to writer.  Returns the number of positions evaluated.'''
+    if smasher is None:
+        smasher = cgt.GrundySmasher()
+    count = 0
+    items, build = SWEEPS[name]
+    for index, item in shard_of(items(args), args.shard):
+        position = build(item)
+        start = time.time()
+        nimber = smasher.evaluate(position)
+        writer.write({"sweep": name, "index": index, "nimber": nimber, "seconds": round(time.time() - start, 6), "position": position_to_json(position)})
+        count += 1
+    return count
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Run one shard of a QuantumNim or AvoidTrue sweep, streaming the nimbers found.")
+    parser.add_argument("sweep", choices = sorted(SWEEPS))
+    parser.add_argument("--shard", type = parse_shard, default = (0, 1), help = "which part of the sweep to run, as k/N (default 0/1, i.e. everything)")
+    parser.add_argument("--format", choices = ["jsonl", "csv"], default = "jsonl")
+    parser.add_argument("--output", default = None, help = "file to write to (default: standard output)")
+    parser.add_argument("--biggest", type = int, default = 6, help = "largest pile size for the quantum-nim sweep")
+    parser.add_argument("--num-vars", type = int, default = 8, help = "number of variables for the avoid-true sweeps")
+    args = parser.parse_args(argv)
+    stream = sys.stdout if args.output is None else open(args.output, "w", newline = "")
+    try:
+        writer = JsonLinesWriter(stream) if args.format == "jsonl" else CsvWriter(stream)
+        count = run_sweep(args.sweep, args, writer)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    print("Evaluated", count, "positions in shard", str(args.shard[0]) + "/" + str(args.shard[1]), "of", args.sweep, file = sys.stderr)
+
+#run the sweep if we're just executing this file directly and not importing it.
+if __name__ == "__main__":
+    main()